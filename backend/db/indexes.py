@@ -0,0 +1,217 @@
+import argparse
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.database import Database
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+KEYWORDS_COLLECTION = os.getenv("KEYWORDS_COLLECTION", "keywords")
+FAQ_COLLECTION = os.getenv("FAQ_COLLECTION", "faqs")
+# Chat logs older than this are removed by a TTL index on `timestamp`; 0 keeps them forever.
+LOG_TTL_DAYS = int(os.getenv("LOG_TTL_DAYS", "0"))
+
+# Mongo error codes for an index that exists under the same name/keys with different options.
+_INDEX_CONFLICT_CODES = (85, 86)
+
+# --- Index Registry ---
+# Every index the application relies on. `db` is "chatbot" or "admin"; `options`
+# are passed to create_index. Indexes keep MongoDB's default names (see index_name()).
+INDEXES: List[Dict[str, Any]] = [
+    # ETL upserts, admin add_faq and the snapshot refresh look FAQs up by question_id.
+    {"db": "chatbot", "collection": FAQ_COLLECTION,
+     "keys": [("question_id", ASCENDING)], "options": {"unique": True}},
+    # Incremental index refresh (FAQ_REFRESH_MODE=poll) and the snapshot staleness check.
+    {"db": "chatbot", "collection": FAQ_COLLECTION,
+     "keys": [("updated_at", ASCENDING)]},
+    # Synonym expansion: multikey indexes over the synonym arrays.
+    {"db": "chatbot", "collection": KEYWORDS_COLLECTION,
+     "keys": [("english_synonyms", ASCENDING)]},
+    {"db": "chatbot", "collection": KEYWORDS_COLLECTION,
+     "keys": [("hindi_synonyms", ASCENDING)]},
+    {"db": "chatbot", "collection": KEYWORDS_COLLECTION,
+     "keys": [("updated_at", DESCENDING)]},
+    # Admin log pages are sorted newest first by (timestamp, _id); each filter has a
+    # compound index ending in that sort key so a page is a bounded index scan.
+    {"db": "chatbot", "collection": "logs",
+     "keys": [("timestamp", DESCENDING), ("_id", DESCENDING)]},
+    {"db": "chatbot", "collection": "logs",
+     "keys": [("status", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]},
+    {"db": "chatbot", "collection": "logs",
+     "keys": [("language", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]},
+    {"db": "chatbot", "collection": "logs",
+     "keys": [("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]},
+    {"db": "chatbot", "collection": "logs",
+     "keys": [("answer", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]},
+    # Login and registration look users up by email.
+    {"db": "admin", "collection": "users",
+     "keys": [("email", ASCENDING)], "options": {"unique": True}},
+    {"db": "admin", "collection": "admins",
+     "keys": [("email", ASCENDING)], "options": {"unique": True}},
+]
+
+# TTL indexes must be single-field; this one is created, updated or dropped to follow LOG_TTL_DAYS.
+LOG_TTL_INDEX = {"db": "chatbot", "collection": "logs", "keys": [("timestamp", ASCENDING)]}
+
+# Representative hot queries, explained by the usage report: (db, collection, filter, sort).
+HOT_QUERIES = [
+    ("chatbot", FAQ_COLLECTION, {"question_id": "Q1"}, None),
+    ("chatbot", KEYWORDS_COLLECTION, {"english_synonyms": {"$in": ["wage"]}}, None),
+    ("chatbot", KEYWORDS_COLLECTION, {"hindi_synonyms": {"$in": ["वेतन"]}}, None),
+    ("chatbot", "logs", {}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("chatbot", "logs", {"status": "unanswered"}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("chatbot", "logs", {"answer": None}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("admin", "users", {"email": "admin@example.com"}, None),
+    ("admin", "admins", {"email": "admin@example.com"}, None),
+]
+
+
+def index_name(keys: List[tuple]) -> str:
+    """MongoDB's default index name, e.g. [("status", 1), ("timestamp", -1)] -> "status_1_timestamp_-1"."""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def _databases(chatbot_db: Database, admin_db: Optional[Database]) -> Dict[str, Database]:
+    return {"chatbot": chatbot_db, "admin": admin_db if admin_db is not None else chatbot_db}
+
+
+def _ensure_ttl_index(db: Database, ttl_days: int) -> str:
+    collection = db[LOG_TTL_INDEX["collection"]]
+    name = index_name(LOG_TTL_INDEX["keys"])
+    existing = collection.index_information().get(name)
+    if ttl_days <= 0:
+        if existing is None:
+            return "disabled"
+        collection.drop_index(name)
+        return "dropped"
+    seconds = ttl_days * 86400
+    if existing is None:
+        collection.create_index(LOG_TTL_INDEX["keys"], name=name, expireAfterSeconds=seconds)
+        return "created"
+    if existing.get("expireAfterSeconds") != seconds:
+        db.command("collMod", collection.name, index={"name": name, "expireAfterSeconds": seconds})
+        return "updated"
+    return "exists"
+
+
+def ensure_indexes(chatbot_db: Database, admin_db: Optional[Database] = None,
+                   ttl_days: int = LOG_TTL_DAYS) -> Dict[str, str]:
+    """
+    Creates every index in the registry that does not exist yet (create_index is a
+    no-op for an identical existing index, so this is safe to run on every startup).
+    An index that cannot be built, e.g. a unique index over duplicate values, is
+    logged and skipped so the application still starts.
+    Args:
+        chatbot_db: Chatbot database
+        admin_db: Admin database (defaults to chatbot_db)
+        ttl_days: Retention of chat logs in days; 0 drops the TTL index
+    Returns:
+        "<collection>.<index name>" -> "ok" ("created"/"updated"/"dropped"/"exists"/"disabled"
+        for the TTL index), or the error that prevented the build
+    """
+    databases = _databases(chatbot_db, admin_db)
+    results = {}
+    for spec in INDEXES:
+        key = f"{spec['collection']}.{index_name(spec['keys'])}"
+        try:
+            databases[spec["db"]][spec["collection"]].create_index(spec["keys"], **spec.get("options", {}))
+            results[key] = "ok"
+        except OperationFailure as e:
+            hint = " (an index on these keys exists with other options)" if e.code in _INDEX_CONFLICT_CODES else ""
+            logger.error(f"Could not ensure index {key}{hint}: {e}")
+            results[key] = f"error: {e}"
+    key = f"{LOG_TTL_INDEX['collection']}.{index_name(LOG_TTL_INDEX['keys'])}"
+    try:
+        results[key] = _ensure_ttl_index(databases[LOG_TTL_INDEX["db"]], ttl_days)
+    except OperationFailure as e:
+        logger.error(f"Could not ensure TTL index {key}: {e}")
+        results[key] = f"error: {e}"
+    failed = sum(result.startswith("error") for result in results.values())
+    logger.info(f"Ensured {len(results) - failed}/{len(results)} indexes "
+                f"(log TTL: {f'{ttl_days} days' if ttl_days > 0 else 'off'}).")
+    return results
+
+
+def _plan_summary(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Stages and index names of a (possibly nested) explain winning plan."""
+    stages, index_names = [], []
+
+    def walk(node: Any) -> None:
+        if isinstance(node, dict):
+            if "stage" in node:
+                stages.append(node["stage"])
+            if "indexName" in node:
+                index_names.append(node["indexName"])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan)
+    return {"stages": stages, "indexes": index_names, "collection_scan": "COLLSCAN" in stages}
+
+
+def index_usage_report(chatbot_db: Database, admin_db: Optional[Database] = None,
+                       queries: Iterable[tuple] = HOT_QUERIES) -> Dict[str, Any]:
+    """
+    How the registry is used on a live deployment.
+    Returns:
+        {"indexes": per collection, the $indexStats access count of each index since
+         the server started, "queries": the winning plan of each hot query and how
+         many keys/documents it examined}
+    """
+    databases = _databases(chatbot_db, admin_db)
+    usage: Dict[str, Dict[str, Any]] = {}
+    for db_key, collection in sorted({(spec["db"], spec["collection"]) for spec in INDEXES + [LOG_TTL_INDEX]}):
+        stats = databases[db_key][collection].aggregate([{"$indexStats": {}}])
+        usage[f"{db_key}.{collection}"] = {
+            stat["name"]: {"ops": stat["accesses"]["ops"], "since": stat["accesses"]["since"].isoformat()}
+            for stat in stats
+        }
+    plans = []
+    for db_key, collection, query, sort in queries:
+        cursor = databases[db_key][collection].find(query).limit(100)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = cursor.explain()
+        execution = explain.get("executionStats", {})
+        plans.append({
+            "collection": f"{db_key}.{collection}",
+            "filter": query,
+            "sort": sort,
+            **_plan_summary(explain.get("queryPlanner", {}).get("winningPlan", {})),
+            "keys_examined": execution.get("totalKeysExamined"),
+            "docs_examined": execution.get("totalDocsExamined"),
+        })
+    return {"indexes": usage, "queries": plans}
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Apply the MongoDB index registry or report index usage.")
+    parser.add_argument("--report", action="store_true", help="Print index usage and hot query plans instead")
+    args = parser.parse_args()
+
+    client = None
+    try:
+        client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/"), serverSelectionTimeoutMS=5000)
+        client.admin.command('ping')
+        chatbot = client[os.getenv("DB_NAME", "chatbot_db")]
+        admin = client[os.getenv("ADMIN_DB_NAME", "admin_db")]
+        result = index_usage_report(chatbot, admin) if args.report else ensure_indexes(chatbot, admin)
+        print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    except ConnectionFailure as e:
+        logger.error(f"MongoDB connection failed: {e}")
+    finally:
+        if client:
+            client.close()
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from backend.db.mongo_utils import get_chatbot_db, run_db
+from backend.services.metrics import LOG_FLUSH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "200"))              # flush once this many entries are queued
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))    # ...or after this many seconds
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))              # bound on entries held in memory
+LOG_QUEUE_BLOCK = os.getenv("LOG_QUEUE_BLOCK", "false").lower() == "true"  # wait for space instead of dropping
+
+_STOP = object()  # queued by close() so the worker flushes what is left and exits
+
+
+class LogWriter:
+    """
+    Background sink for chat log entries.
+    Request handlers enqueue LogEntry documents and return immediately; a
+    worker flushes them to the `logs` collection with insert_many(ordered=False)
+    when LOG_BATCH_SIZE entries are waiting or LOG_FLUSH_INTERVAL has passed.
+    The queue is bounded: when it is full, entries are dropped (and counted)
+    unless LOG_QUEUE_BLOCK is set, in which case callers wait for space.
+    """
+
+    def __init__(self, batch_size: int = LOG_BATCH_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL,
+                 max_queue: int = LOG_QUEUE_MAX, block: bool = LOG_QUEUE_BLOCK, collection: str = "logs"):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.block = block
+        self.collection = collection
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Counters
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            if self._queue is None:
+                # Created lazily so the queue binds to the serving event loop.
+                self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def write(self, entry: Dict[str, Any]) -> bool:
+        """
+        Queues a log entry for the next flush.
+        Returns:
+            False if the entry was dropped because the queue is full
+        """
+        self._ensure_worker()
+        if self.block:
+            await self._queue.put(entry)
+        else:
+            try:
+                self._queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    logger.warning(f"Log queue full ({self.max_queue}); {self.dropped} log entries dropped so far.")
+                return False
+        self.enqueued += 1
+        return True
+
+    async def _collect(self) -> Tuple[List[Dict[str, Any]], bool]:
+        """Waits for the next batch. Returns (batch, stop requested)."""
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _insert(self, batch: List[Dict[str, Any]]) -> int:
+        try:
+            result = get_chatbot_db()[self.collection].insert_many(batch, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Unordered: everything but the failing documents was still written.
+            return e.details.get("nInserted", 0)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            with LOG_FLUSH_SECONDS.time():
+                inserted = await run_db(self._insert, batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} log entries: {e}", exc_info=True)
+            inserted = 0
+        self.flushes += 1
+        self.written += inserted
+        self.failed += len(batch) - inserted
+        logger.debug(f"📝 Flushed {inserted}/{len(batch)} log entries.")
+
+    async def _run(self) -> None:
+        while True:
+            batch, stop = await self._collect()
+            if batch:
+                await self._flush(batch)
+            if stop:
+                return
+
+    async def close(self) -> None:
+        """Flushes everything still queued and stops the worker (shutdown hook)."""
+        if self._worker is None:
+            return
+        if not self._worker.done():
+            await self._queue.put(_STOP)
+            await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        self._queue = None
+        logger.info(f"Log writer closed: {self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+# Global writer instance
+log_writer = LogWriter()
+
+
+async def enqueue_log_entry(entry: Dict[str, Any]) -> bool:
+    """Queues a chat log entry for a background batched insert."""
+    return await log_writer.write(entry)
@@ -1,9 +1,19 @@
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, TypeVar
+from bson import ObjectId
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 import bcrypt
 
+from backend.db.indexes import ensure_indexes
+from backend.nlp.quantization import embedding_update
+
 logger = logging.getLogger(__name__)
 
 # Clients and DBs
@@ -11,6 +21,21 @@ client: Optional[MongoClient] = None
 chatbot_db = None
 admin_db = None
 
+# PyMongo is synchronous; request handlers run its calls on this bounded pool so a
+# slow query never blocks the event loop.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="mongo")
+
+# Create missing indexes from the registry (backend/db/indexes.py) on connect; turn off
+# to manage them only with `python -m backend.db.indexes`.
+ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+
+T = TypeVar("T")
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a blocking PyMongo call on the DB thread pool and awaits its result."""
+    return await asyncio.get_running_loop().run_in_executor(db_executor, partial(fn, *args, **kwargs))
+
 async def connect_to_mongo(mongo_uri: str, chatbot_db_name: str, admin_db_name: str):
     global client, chatbot_db, admin_db
     try:
@@ -18,6 +43,8 @@ async def connect_to_mongo(mongo_uri: str, chatbot_db_name: str, admin_db_name:
         client.admin.command('ping')
         chatbot_db = client[chatbot_db_name]
         admin_db = client[admin_db_name]
+        if ENSURE_INDEXES:
+            ensure_indexes(chatbot_db, admin_db)
         logger.info(f"✅ Connected to MongoDB: {chatbot_db_name} & {admin_db_name}")
     except ConnectionFailure as e:
         logger.error(f"❌ MongoDB connection failed: {e}")
@@ -26,6 +53,24 @@ async def connect_to_mongo(mongo_uri: str, chatbot_db_name: str, admin_db_name:
         logger.error(f"❌ Unexpected error connecting to MongoDB: {e}", exc_info=True)
         raise
 
+@contextmanager
+def temporary_mongo_connection(mongo_uri: str, chatbot_db_name: str, admin_db_name: str):
+    """
+    Synchronous connection for work done outside the event loop, such as
+    preloading in a pre-fork parent. The client is closed and the module
+    globals cleared on exit, so no MongoClient is inherited across fork().
+    """
+    global client, chatbot_db, admin_db
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    try:
+        client.admin.command('ping')
+        chatbot_db = client[chatbot_db_name]
+        admin_db = client[admin_db_name]
+        yield chatbot_db
+    finally:
+        client.close()
+        client = chatbot_db = admin_db = None
+
 async def close_mongo_connection():
     global client
     if client:
@@ -38,27 +83,128 @@ def get_chatbot_db():
         raise ConnectionFailure("Chatbot DB connection not established.")
     return chatbot_db
 
-def get_all_faqs() -> List[Dict[str, Any]]:
-    faqs = list(get_chatbot_db()["faqs"].find({}, {"_id": 0}))
+def get_all_faqs(with_ids: bool = False, with_embeddings: bool = True) -> List[Dict[str, Any]]:
+    projection = {} if with_ids else {"_id": 0}
+    if not with_embeddings:
+        projection.update({"embedding": 0, "embedding_q": 0})
+    faqs = list(get_chatbot_db()["faqs"].find({}, projection or None))
     logger.info(f"Fetched {len(faqs)} FAQs from Chatbot DB.")
     return faqs
-# Compatibility alias for old code
-def get_mongo_db():
-    return get_chatbot_db()
 
-async def insert_log_entry(entry: Dict[str, Any]) -> str:
-    result = get_chatbot_db()["logs"].insert_one(entry)
-    logger.info(f"📝 Log entry inserted with ID: {result.inserted_id}")
-    return str(result.inserted_id)
+def upsert_faq(faq_doc: Dict[str, Any]) -> None:
+    get_chatbot_db()["faqs"].update_one({"question_id": faq_doc["question_id"]}, embedding_update(faq_doc), upsert=True)
+    logger.info(f"FAQ {faq_doc['question_id']} upserted.")
+
+def get_faqs_by_ids(question_ids: List[str]) -> List[Dict[str, Any]]:
+    """Full FAQ documents (with embeddings) for the given question_ids."""
+    if not question_ids:
+        return []
+    return list(get_chatbot_db()["faqs"].find({"question_id": {"$in": question_ids}}))
+
+def get_faqs_updated_since(since: datetime) -> List[Dict[str, Any]]:
+    """FAQs whose updated_at is at or after `since` (used for incremental index refresh)."""
+    return list(get_chatbot_db()["faqs"].find({"updated_at": {"$gte": since}}))
 
-def get_unanswered_logs() -> List[Dict[str, Any]]:
-    logs = get_chatbot_db()["logs"].find({"answer": None})
-    return [{**log, "_id": str(log["_id"])} for log in logs]
+def get_faq_ids() -> Set[str]:
+    """All question_ids currently in the FAQ collection, without loading embeddings."""
+    return {doc.get("question_id") for doc in get_chatbot_db()["faqs"].find({}, {"_id": 0, "question_id": 1})}
 
-def get_all_logs_entries() -> List[Dict[str, Any]]:
-    logs = get_chatbot_db()["logs"].find({})
-    return [{**log, "_id": str(log["_id"])} for log in logs]
+def count_faqs() -> int:
+    return get_chatbot_db()["faqs"].count_documents({})
 
+def watch_faqs(resume_after: Optional[Dict[str, Any]] = None, max_await_time_ms: int = 1000):
+    """Opens a change stream on the FAQ collection (replica sets / Atlas only)."""
+    return get_chatbot_db()["faqs"].watch(
+        full_document="updateLookup", resume_after=resume_after, max_await_time_ms=max_await_time_ms
+    )
+
+# Compatibility alias for old code
+def get_mongo_db():
+    return get_chatbot_db()
+
+def get_keywords_version(keywords_collection: str = "keywords") -> tuple:
+    """Cheap fingerprint of the synonym set: (document count, latest updated_at)."""
+    collection = get_chatbot_db()[keywords_collection]
+    latest = collection.find_one({"updated_at": {"$exists": True}}, {"_id": 0, "updated_at": 1},
+                                 sort=[("updated_at", -1)])
+    return collection.count_documents({}), latest.get("updated_at") if latest else None
+
+# Log pages are ordered newest first by (timestamp, _id); backend/db/indexes.py
+# registers a compound index ending in this sort key for every filter.
+LOG_SORT = [("timestamp", -1), ("_id", -1)]
+LOG_FIELDS = ("timestamp", "user_id", "query_text", "bot_response_text", "status", "language",
+              "similarity_score", "answer")
+
+def encode_log_cursor(log: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing just past the given log entry."""
+    timestamp = log.get("timestamp")
+    return f"{timestamp.isoformat() if isinstance(timestamp, datetime) else ''}_{log['_id']}"
+
+def decode_log_cursor(cursor: str) -> tuple:
+    """Inverse of encode_log_cursor(); raises ValueError for a malformed cursor."""
+    timestamp, _, object_id = cursor.rpartition("_")
+    if not ObjectId.is_valid(object_id):
+        raise ValueError(f"Invalid log cursor: {cursor!r}")
+    return (datetime.fromisoformat(timestamp) if timestamp else None), ObjectId(object_id)
+
+def log_filter(unanswered: bool = False, status: Optional[str] = None, language: Optional[str] = None,
+               user_id: Optional[str] = None, start: Optional[datetime] = None,
+               end: Optional[datetime] = None) -> Dict[str, Any]:
+    """Mongo filter for the admin log views (start inclusive, end exclusive)."""
+    query: Dict[str, Any] = {"answer": None} if unanswered else {}
+    for field, value in (("status", status), ("language", language), ("user_id", user_id)):
+        if value is not None:
+            query[field] = value
+    if start is not None or end is not None:
+        query["timestamp"] = {key: value for key, value in (("$gte", start), ("$lt", end)) if value is not None}
+    return query
+
+def find_logs(query: Dict[str, Any], limit: int, after: Optional[str] = None,
+              fields: Optional[List[str]] = None) -> tuple:
+    """
+    One page of log entries, newest first.
+    Args:
+        query: Filter from log_filter()
+        limit: Maximum number of entries to return
+        after: Cursor returned with the previous page (None for the first page)
+        fields: Log fields to return (all when None); _id is always included
+    Returns:
+        (logs, next_cursor): next_cursor is None on the last page
+    """
+    if after:
+        timestamp, object_id = decode_log_cursor(after)
+        if timestamp is None:  # entries without a timestamp sort last
+            keyset = {"timestamp": None, "_id": {"$lt": object_id}}
+        else:
+            keyset = {"$or": [{"timestamp": {"$lt": timestamp}},
+                              {"timestamp": timestamp, "_id": {"$lt": object_id}},
+                              {"timestamp": None}]}
+        query = {"$and": [query, keyset]} if query else keyset
+    # The cursor needs the timestamp even when it was not asked for.
+    projection = {**dict.fromkeys(fields, 1), "timestamp": 1} if fields else None
+    drop_timestamp = bool(fields) and "timestamp" not in fields
+    # Fetch one extra entry to learn whether another page follows.
+    logs = list(get_chatbot_db()["logs"].find(query, projection).sort(LOG_SORT).limit(limit + 1))
+    next_cursor = encode_log_cursor(logs[limit - 1]) if len(logs) > limit else None
+    del logs[limit:]
+    for log in logs:
+        log["_id"] = str(log["_id"])
+        if drop_timestamp:
+            log.pop("timestamp", None)
+    return logs, next_cursor
+
+
+def iter_logs(query: Dict[str, Any], batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Streams log entries matching query, oldest first, straight off a Mongo cursor
+    (batch_size documents are held at a time). The cursor is closed when the
+    iterator is exhausted or discarded.
+    """
+    cursor = get_chatbot_db()["logs"].find(query, batch_size=batch_size).sort([("timestamp", 1), ("_id", 1)])
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
 
 # ----- Admin DB Functions -----
 def get_admin_db():
@@ -66,7 +212,7 @@ def get_admin_db():
         raise ConnectionFailure("Admin DB connection not established.")
     return admin_db
 
-async def create_user(user_data: Dict[str, Any]) -> str:
+def _create_user(user_data: Dict[str, Any]) -> str:
     users_collection = get_admin_db()["users"]
 
     if users_collection.find_one({"email": user_data["email"]}):
@@ -79,18 +225,22 @@ async def create_user(user_data: Dict[str, Any]) -> str:
     logger.info(f"👤 User registered with ID: {result.inserted_id}")
     return str(result.inserted_id)
 
+async def create_user(user_data: Dict[str, Any]) -> str:
+    # The lookup, bcrypt hashing and insert all block, so run them together off the loop.
+    return await run_db(_create_user, user_data)
+
 async def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
-    return get_admin_db()["users"].find_one({"email": email})
+    return await run_db(get_admin_db()["users"].find_one, {"email": email})
 
 async def verify_user(email: str, password: str) -> bool:
     user = await get_user_by_email(email)
     if not user:
         return False
-    return bcrypt.checkpw(password.encode('utf-8'), user["hashed_password"].encode('utf-8'))
+    return await run_db(bcrypt.checkpw, password.encode('utf-8'), user["hashed_password"].encode('utf-8'))
 
 async def get_admin_user(email: str) -> Optional[Dict[str, Any]]:
-    return get_admin_db()["admins"].find_one({"email": email})
+    return await run_db(get_admin_db()["admins"].find_one, {"email": email})
 
 async def create_admin_user(admin_data: Dict[str, Any]) -> str:
-    result = get_admin_db()["admins"].insert_one(admin_data)
+    result = await run_db(get_admin_db()["admins"].insert_one, admin_data)
     return str(result.inserted_id)
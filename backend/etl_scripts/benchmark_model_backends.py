@@ -0,0 +1,123 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+# --- Configuration ---
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from backend.nlp.model_loader import (MODEL_BACKENDS, NLP_MODEL_CACHE_DIR, NLP_MODEL_NAME, create_model,
+                                      local_model_path, require_onnx_runtime)
+
+# --- Logging Setup ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SAMPLE_QUERIES = [
+    "What is the minimum wage for unskilled workers?",
+    "न्यूनतम मजदूरी कितनी है?",
+    "How do I register on the e-Shram portal?",
+    "ई-श्रम कार्ड के लिए आवेदन कैसे करें",
+    "PF withdrawal process",
+    "मुझे पीएफ का पैसा कैसे मिलेगा",
+    "maternity benefit for construction workers",
+    "निर्माण श्रमिक पंजीयन",
+]
+
+
+def prepare_model_cache(model_name: str = NLP_MODEL_NAME, cache_dir: str = NLP_MODEL_CACHE_DIR) -> str:
+    """
+    Downloads the model once (network required) and saves it, with an exported
+    ONNX graph and its dynamically quantized variant, under cache_dir so the API
+    can load any backend offline.
+    Returns:
+        The local model directory
+    """
+    from sentence_transformers import SentenceTransformer
+
+    path = local_model_path(model_name, cache_dir)
+    logger.info(f"Saving {model_name} to {path}...")
+    SentenceTransformer(model_name, cache_folder=cache_dir).save(path)
+    try:
+        require_onnx_runtime()
+    except RuntimeError as e:
+        logger.warning(f"ONNX export skipped: {e}")
+        return path
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+    onnx_model = SentenceTransformer(path, backend="onnx", device="cpu")
+    onnx_model.save(path)
+    export_dynamic_quantized_onnx_model(onnx_model, "avx2", path)
+    logger.info(f"Exported ONNX models to {os.path.join(path, 'onnx')}")
+    return path
+
+
+def _measure_backend(backend: str, model_name: str, cache_dir: str, texts: Sequence[str],
+                     repeats: int) -> Dict[str, Any]:
+    """Runs in a fresh process so load time includes importing the runtime."""
+    started = time.perf_counter()
+    model = create_model(model_name, backend=backend, cache_dir=cache_dir, offline=True)
+    load_s = time.perf_counter() - started
+
+    model.encode(texts[:1], convert_to_tensor=False)  # warm-up
+    single = []
+    for _ in range(repeats):
+        for text in texts:
+            started = time.perf_counter()
+            model.encode([text], convert_to_tensor=False)
+            single.append(time.perf_counter() - started)
+    batch = list(texts) * max(1, 32 // len(texts))
+    started = time.perf_counter()
+    embeddings = np.asarray(model.encode(batch, batch_size=len(batch), convert_to_tensor=False), dtype=np.float32)
+    batch_s = time.perf_counter() - started
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "encode_p50_ms": 1000 * float(np.percentile(single, 50)),
+        "encode_p95_ms": 1000 * float(np.percentile(single, 95)),
+        "batch_texts_per_s": len(batch) / batch_s,
+        "embeddings": embeddings[:len(texts)],
+    }
+
+
+def run_benchmark(backends: Sequence[str] = MODEL_BACKENDS, model_name: str = NLP_MODEL_NAME,
+                  cache_dir: str = NLP_MODEL_CACHE_DIR, texts: Sequence[str] = SAMPLE_QUERIES,
+                  repeats: int = 5) -> List[Dict[str, Any]]:
+    """
+    Measures cold load time and encode latency per backend, each in its own
+    process, plus the cosine agreement of its embeddings with the torch backend.
+    """
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for backend in backends:
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results.append(pool.submit(_measure_backend, backend, model_name, cache_dir, list(texts), repeats).result())
+        except Exception as e:
+            logger.error(f"Backend {backend} failed: {e}")
+    reference = next((r["embeddings"] for r in results if r["backend"] == "torch"), None)
+    for result in results:
+        embeddings = result.pop("embeddings")
+        if reference is not None:
+            cosine = np.sum(embeddings * reference, axis=1) / (
+                np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1))
+            result["min_cosine_vs_torch"] = float(cosine.min())
+        logger.info(" | ".join(f"{key}={value:.4f}" if isinstance(value, float) else f"{key}={value}"
+                               for key, value in result.items()))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start and encode latency of the NLP model backends.")
+    parser.add_argument("--prepare", action="store_true", help="Download and export models into the local cache first")
+    parser.add_argument("--backends", nargs="+", default=list(MODEL_BACKENDS), choices=MODEL_BACKENDS)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    if args.prepare:
+        prepare_model_cache()
+    run_benchmark(args.backends, repeats=args.repeats)
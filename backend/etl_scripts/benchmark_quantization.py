@@ -0,0 +1,122 @@
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
+from sentence_transformers import SentenceTransformer
+import argparse
+import os
+import logging
+import time
+from typing import List, Dict, Any, Sequence
+
+import bson
+import numpy as np
+from dotenv import load_dotenv
+
+from backend.nlp.faq_index import FAQIndex, faq_embedding_text
+from backend.nlp.quantization import SUPPORTED_DTYPES, decode_embedding, encode_embedding
+
+# --- Configuration ---
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+MONGO_URI = os.getenv("MONGO_URI")
+DB_NAME = os.getenv("DB_NAME", "chatbot_db")
+FAQ_COLLECTION = os.getenv("FAQ_COLLECTION", "faqs")
+NLP_MODEL_NAME = os.getenv("NLP_MODEL_NAME", "paraphrase-multilingual-MiniLM-L12-v2")
+
+# --- Logging Setup ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def evaluate_quantization(faqs: List[Dict[str, Any]], queries: np.ndarray,
+                          ks: Sequence[int] = (1, 5, 10)) -> List[Dict[str, Any]]:
+    """
+    Scores every query against a float32 index and a float16 / int8 index over
+    the same FAQs.
+    Args:
+        faqs: FAQ documents carrying an embedding
+        queries: Query embeddings, one per row
+        ks: Cut-offs for recall@k, measured against the float32 top-k
+    Returns:
+        One row per dtype: recall@k, mean |score delta| of the top match, bytes
+        per FAQ in the scoring matrix and in the stored document, and mean
+        search latency in milliseconds
+    """
+    faqs = [{"question_id": faq["question_id"], "embedding": decode_embedding(faq)} for faq in faqs
+            if decode_embedding(faq) is not None]
+    top_k = max(ks)
+    results: List[Dict[str, Any]] = []
+    reference = None
+    for dtype in SUPPORTED_DTYPES:
+        index = FAQIndex(dtype=dtype)
+        index.build(faqs)
+        started = time.perf_counter()
+        matches = [index.search(query, top_k=top_k) for query in queries]
+        latency_ms = 1000 * (time.perf_counter() - started) / max(1, len(queries))
+        ranked = [[meta["question_id"] for meta, _ in found] for found in matches]
+        best_scores = np.array([found[0][1] if found else 0.0 for found in matches])
+        if reference is None:
+            reference = (ranked, best_scores)
+        row = {
+            "dtype": dtype,
+            "index_bytes_per_faq": index.nbytes / max(1, len(index)),
+            "document_bytes_per_faq": float(np.mean([
+                len(bson.encode(encode_embedding(faq["embedding"], dtype))) for faq in faqs
+            ])) if faqs else 0.0,
+            "mean_top1_score_delta": float(np.mean(np.abs(best_scores - reference[1]))) if len(queries) else 0.0,
+            "search_ms": latency_ms,
+        }
+        for k in ks:
+            row[f"recall@{k}"] = float(np.mean([
+                len(set(found[:k]) & set(expected[:k])) / max(1, len(expected[:k]))
+                for found, expected in zip(ranked, reference[0])
+            ])) if len(queries) else 1.0
+        results.append(row)
+    return results
+
+
+def run_benchmark(queries_path: str = None, limit: int = 0):
+    """
+    Benchmarks quantized FAQ scoring on the FAQ collection. Queries are read one
+    per line from queries_path, or default to each FAQ's question (falling back
+    to its full embedding text).
+    """
+    client = None
+    try:
+        logger.info("Connecting to MongoDB for quantization benchmark...")
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+        client.admin.command('ping')
+        faqs = list(client[DB_NAME][FAQ_COLLECTION].find({}, {"_id": 0}))
+        logger.info(f"Loaded {len(faqs)} FAQs.")
+
+        if queries_path:
+            with open(queries_path, encoding="utf-8") as f:
+                query_texts = [line.strip() for line in f if line.strip()]
+        else:
+            query_texts = [faq.get("question") or faq_embedding_text(faq) for faq in faqs]
+            query_texts = [text for text in query_texts if text]
+        if limit:
+            query_texts = query_texts[:limit]
+
+        logger.info(f"Encoding {len(query_texts)} queries with {NLP_MODEL_NAME}...")
+        model = SentenceTransformer(NLP_MODEL_NAME)
+        queries = np.asarray(model.encode(query_texts, batch_size=64, convert_to_tensor=False), dtype=np.float32)
+
+        for row in evaluate_quantization(faqs, queries):
+            logger.info(" | ".join(f"{key}={value:.4f}" if isinstance(value, float) else f"{key}={value}"
+                                   for key, value in row.items()))
+    except ConnectionFailure as e:
+        logger.error(f"MongoDB connection failed during benchmark: {e}")
+    except Exception as e:
+        logger.error(f"An error occurred during benchmark: {e}", exc_info=True)
+    finally:
+        if client:
+            client.close()
+            logger.info("MongoDB connection closed for benchmark.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall and memory of float16/int8 FAQ embeddings vs float32.")
+    parser.add_argument("--queries", help="Text file with one query per line (default: FAQ questions)")
+    parser.add_argument("--limit", type=int, default=0, help="Use at most this many queries")
+    args = parser.parse_args()
+    run_benchmark(args.queries, args.limit)
@@ -0,0 +1,92 @@
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
+import os
+import logging
+from dotenv import load_dotenv
+
+from backend.nlp.embedding_store import FAQ_SNAPSHOT_PATH, write_snapshot
+from backend.nlp.faq_index import IVFFAQIndex, FAQ_INDEX_PATH
+from backend.nlp.quantization import decode_embedding
+
+# --- Configuration ---
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+MONGO_URI = os.getenv("MONGO_URI")
+DB_NAME = os.getenv("DB_NAME", "chatbot_db")
+FAQ_COLLECTION = os.getenv("FAQ_COLLECTION", "faqs")
+NLP_MODEL_NAME = os.getenv("NLP_MODEL_NAME", "paraphrase-multilingual-MiniLM-L12-v2")
+IVF_TRAIN_ITERATIONS = int(os.getenv("FAQ_IVF_TRAIN_ITERATIONS", "20"))
+IVF_RECALL_TOP_K = int(os.getenv("FAQ_IVF_RECALL_TOP_K", "10"))
+
+# --- Logging Setup ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def build_faq_index(faqs_collection, index_path: str = FAQ_INDEX_PATH) -> None:
+    """
+    Trains the IVF FAQ index over every FAQ embedding in the collection and
+    writes it to index_path, where the API loads it at startup instead of
+    training k-means itself.
+    """
+    logger.info("Building IVF FAQ index...")
+    index = IVFFAQIndex()
+    index.build(faqs_collection.find({}, {"_id": 0}))
+    if len(index) == 0:
+        logger.warning("No FAQ embeddings found; skipping IVF index build.")
+        return
+    index.train(iterations=IVF_TRAIN_ITERATIONS)
+    index.save(index_path, model_name=NLP_MODEL_NAME)
+    report_recall(index)
+
+
+def report_recall(index: IVFFAQIndex, top_k: int = IVF_RECALL_TOP_K) -> None:
+    """Logs recall@top_k against exact search for the configured nprobe and a few alternatives, to tune FAQ_IVF_NPROBE."""
+    configured = index.probes()
+    for nprobe in sorted({max(1, configured // 2), configured, configured * 2, configured * 4}):
+        if nprobe > index.nlist:
+            continue
+        recall = index.measure_recall(nprobe=nprobe, top_k=top_k)
+        marker = " (configured)" if nprobe == configured else ""
+        logger.info(f"IVF recall@{top_k} with nprobe={nprobe}/{index.nlist}{marker}: {recall:.3f}")
+
+
+def build_embedding_snapshot(faqs_collection, snapshot_path: str = FAQ_SNAPSHOT_PATH) -> None:
+    """
+    Streams every FAQ embedding out of the collection into the binary snapshot
+    the API memory-maps at startup (see backend/nlp/embedding_store.py).
+    """
+    if not snapshot_path:
+        logger.info("FAQ_SNAPSHOT_PATH is empty; skipping embedding snapshot.")
+        return
+    logger.info("Writing FAQ embedding snapshot...")
+    cursor = faqs_collection.find(
+        {"$or": [{"embedding": {"$exists": True}}, {"embedding_q": {"$exists": True}}]},
+        {"_id": 0, "question_id": 1, "embedding": 1, "embedding_q": 1, "embedding_dtype": 1, "embedding_scale": 1},
+    )
+    rows = ((doc["question_id"], embedding) for doc in cursor
+            for embedding in [decode_embedding(doc)] if embedding is not None)
+    write_snapshot(snapshot_path, rows, model_name=NLP_MODEL_NAME)
+
+
+def run_index_build(index_path: str = FAQ_INDEX_PATH):
+    """Runs the offline snapshot and IVF index builds against the configured FAQ collection."""
+    client = None
+    try:
+        logger.info("Connecting to MongoDB for FAQ index build...")
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+        client.admin.command('ping')
+        build_embedding_snapshot(client[DB_NAME][FAQ_COLLECTION])
+        build_faq_index(client[DB_NAME][FAQ_COLLECTION], index_path)
+    except ConnectionFailure as e:
+        logger.error(f"MongoDB connection failed during FAQ index build: {e}")
+    except Exception as e:
+        logger.error(f"An error occurred during FAQ index build: {e}", exc_info=True)
+    finally:
+        if client:
+            client.close()
+            logger.info("MongoDB connection closed for FAQ index build.")
+
+
+if __name__ == "__main__":
+    run_index_build()
@@ -1,11 +1,20 @@
+import numpy as np
 import pandas as pd
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from pymongo.errors import ConnectionFailure
 from sentence_transformers import SentenceTransformer
 import os
+import hashlib
 import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
+
+from backend.etl_scripts.build_faq_index import build_embedding_snapshot, build_faq_index
+from backend.nlp.quantization import EMBEDDING_STORAGE_DTYPE, embedding_update, encode_embedding
 
 # --- Configuration ---
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '..', 'backend', '.env'))
@@ -14,20 +23,268 @@ MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME", "chatbot_db")
 FAQ_COLLECTION = os.getenv("FAQ_COLLECTION", "faqs")
 NLP_MODEL_NAME = os.getenv("NLP_MODEL_NAME", "paraphrase-multilingual-MiniLM-L12-v2")
+FAQ_INDEX_BACKEND = os.getenv("FAQ_INDEX_BACKEND", "exact")
+
+ENCODE_BATCH_SIZE = int(os.getenv("ETL_ENCODE_BATCH_SIZE", "64"))
+ENCODE_PROCESSES = int(os.getenv("ETL_ENCODE_PROCESSES", "1"))      # >1 starts a multi-process encode pool
+BULK_WRITE_CHUNK_SIZE = int(os.getenv("ETL_BULK_WRITE_CHUNK_SIZE", "1000"))
+ETL_CHUNK_ROWS = int(os.getenv("ETL_CHUNK_ROWS", "5000"))             # source rows held in memory at once
+ETL_DELETE_MISSING = os.getenv("ETL_DELETE_MISSING", "true").lower() == "true"  # drop FAQs no longer in the CSV
 
 # --- Logging Setup ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def run_etl(faq_data_path: str):
+
+def log_stage_rate(stage: str, rows: int, seconds: float) -> None:
+    rate = rows / seconds if seconds > 0 else float("inf")
+    logger.info(f"[{stage}] {rows} rows in {seconds:.2f}s ({rate:,.0f} rows/s)")
+
+
+def split_keywords(column: pd.Series) -> pd.Series:
+    return column.astype(str).str.split(',').map(lambda keywords: [k.strip() for k in keywords if k.strip()])
+
+
+def normalize_faq_id(value: str) -> str:
+    """
+    question_id for a raw CSV ID. Integral numbers are written without leading
+    zeros or a trailing ".0" ("001", "1.0" -> "1"), matching the IDs the earlier
+    ingestion produced from pandas' numeric parsing of the column; anything else
+    is kept as text.
+    """
+    value = value.strip()
+    if value.lstrip("+-").isdigit():
+        return str(int(value))
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return str(int(number)) if number.is_integer() else value
+
+
+def clean_faq_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Column-wise cleaning of the raw FAQ CSV into FAQ document fields, plus the
+    text each FAQ is embedded from (question + answers + keywords, as in
+    backend.nlp.faq_index.faq_embedding_text). Rows with no text are dropped.
+    """
+    question = df['Question'] if 'Question' in df.columns else pd.Series('', index=df.index)
+    faqs = pd.DataFrame({
+        "question_id": df['ID'].astype(str).map(normalize_faq_id),
+        "category": df['category'].astype(str).str.strip(),
+        "question": question.astype(str).str.strip(),
+        "answer_en": df['answer_en'].astype(str).str.strip(),
+        "answer_hi": df['answer_hi'].astype(str).str.strip(),
+        "keywords_en": split_keywords(df['keywords_en']),
+        "keywords_hi": split_keywords(df['keywords_hi']),
+    })
+    embedding_text = (
+        faqs['question'] + " " + faqs['answer_en'] + " " + faqs['answer_hi'] + " "
+        + faqs['keywords_en'].map(" ".join) + " " + faqs['keywords_hi'].map(" ".join)
+    ).str.strip()
+
+    empty = embedding_text == ""
+    for question_id in faqs.loc[empty, 'question_id']:
+        logger.warning(f"Skipping FAQ ID {question_id} due to missing text for embedding.")
+    faqs = faqs[~empty].copy()
+    faqs['embedding_text'] = embedding_text[~empty]
+    faqs['content_hash'] = faqs['embedding_text'].map(content_hash)
+    # A question_id listed twice keeps its last row, as the old row-by-row upserts did.
+    return faqs.drop_duplicates(subset='question_id', keep='last')
+
+
+def content_hash(text: str) -> str:
+    """Fingerprint of an FAQ's embedding input text, stored to skip unchanged rows on the next run."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def get_stored_faq_state(faqs_collection, question_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    question_id -> stored content_hash / model_name / category, without loading embeddings.
+    Args:
+        question_ids: Restrict the lookup to these FAQs (one source chunk); None reads all
+    """
+    query = {} if question_ids is None else {"question_id": {"$in": question_ids}}
+    projection = {"_id": 0, "question_id": 1, "content_hash": 1, "model_name": 1, "category": 1, "embedding_dtype": 1}
+    return {doc["question_id"]: doc for doc in faqs_collection.find(query, projection) if "question_id" in doc}
+
+
+def get_etl_faq_ids(faqs_collection) -> List[str]:
+    """question_ids of the FAQs written by this ETL (they carry a content_hash), streamed by cursor."""
+    cursor = faqs_collection.find({"content_hash": {"$exists": True}}, {"_id": 0, "question_id": 1})
+    return [doc["question_id"] for doc in cursor if "question_id" in doc]
+
+
+def diff_faqs(faqs: pd.DataFrame, stored: Dict[str, Dict[str, Any]], model_name: str,
+              storage_dtype: str = EMBEDDING_STORAGE_DTYPE) -> Tuple[pd.Series, pd.Series]:
+    """
+    Compares cleaned source rows with what is stored.
+    Returns:
+        (needs_embedding, needs_update) boolean masks over faqs. A row needs a new
+        embedding when it is new, its content hash changed, or it was embedded with
+        another model or stored in another dtype; it needs an update without
+        re-embedding when only its category changed.
+    """
+    stored_hash = faqs['question_id'].map(lambda qid: stored.get(qid, {}).get('content_hash'))
+    stored_model = faqs['question_id'].map(lambda qid: stored.get(qid, {}).get('model_name'))
+    stored_category = faqs['question_id'].map(lambda qid: stored.get(qid, {}).get('category'))
+    # Plain float lists carry no embedding_dtype.
+    stored_dtype = faqs['question_id'].map(lambda qid: stored.get(qid, {}).get('embedding_dtype', 'float32'))
+    needs_embedding = ((stored_hash != faqs['content_hash']) | (stored_model != model_name)
+                       | (stored_dtype != storage_dtype))
+    needs_update = ~needs_embedding & (stored_category != faqs['category'])
+    return needs_embedding, needs_update
+
+
+def delete_missing_faqs(faqs_collection, question_ids: List[str], chunk_size: int = BULK_WRITE_CHUNK_SIZE) -> int:
+    """Deletes the given FAQs in chunks of chunk_size ids."""
+    deleted = 0
+    for start in range(0, len(question_ids), chunk_size):
+        result = faqs_collection.delete_many({"question_id": {"$in": question_ids[start:start + chunk_size]}})
+        deleted += result.deleted_count
+    return deleted
+
+
+def encode_texts(model: SentenceTransformer, texts: List[str], pool: Optional[Dict[str, Any]] = None,
+                 batch_size: int = ENCODE_BATCH_SIZE) -> np.ndarray:
+    """Encodes texts in batches, across the multi-process pool when one is given."""
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    if pool is not None:
+        return model.encode_multi_process(texts, pool, batch_size=batch_size)
+    return model.encode(texts, batch_size=batch_size, convert_to_tensor=False, show_progress_bar=False)
+
+
+def bulk_upsert_faqs(faqs_collection, faq_docs: List[Dict[str, Any]],
+                     chunk_size: int = BULK_WRITE_CHUNK_SIZE) -> int:
+    """Upserts FAQ documents by question_id with unordered bulk_write calls of chunk_size operations."""
+    written = 0
+    for start in range(0, len(faq_docs), chunk_size):
+        operations = [
+            UpdateOne({"question_id": doc["question_id"]}, embedding_update(doc), upsert=True)
+            for doc in faq_docs[start:start + chunk_size]
+        ]
+        result = faqs_collection.bulk_write(operations, ordered=False)
+        written += result.upserted_count + result.matched_count
+    return written
+
+
+def read_faq_chunks(faq_data_path: str, chunk_rows: int = ETL_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Streams the FAQ CSV as DataFrames of at most chunk_rows rows."""
+    return pd.read_csv(faq_data_path, keep_default_na=False, dtype=str, chunksize=max(1, chunk_rows))
+
+
+class StageTimer:
+    """Accumulates rows and seconds per pipeline stage across chunks."""
+
+    def __init__(self):
+        self.rows: Counter = Counter()
+        self.seconds: Counter = Counter()
+
+    @contextmanager
+    def stage(self, name: str, rows: int):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.rows[name] += rows
+            self.seconds[name] += time.perf_counter() - started
+
+    def log(self) -> None:
+        for name in self.rows:
+            log_stage_rate(name, self.rows[name], self.seconds[name])
+
+
+class FAQChunkPipeline:
+    """
+    Pushes source chunks through clean -> diff -> embed -> bulk-write, one chunk
+    at a time, so memory is bounded by ETL_CHUNK_ROWS rather than the file size.
+    The model (and encode pool) is loaded on the first chunk with changes.
+    """
+
+    def __init__(self, faqs_collection, model_name: str = NLP_MODEL_NAME,
+                 storage_dtype: str = EMBEDDING_STORAGE_DTYPE):
+        self.faqs_collection = faqs_collection
+        self.model_name = model_name
+        self.storage_dtype = storage_dtype
+        self.model: Optional[SentenceTransformer] = None
+        self.pool: Optional[Dict[str, Any]] = None
+        self.timer = StageTimer()
+        self.source_ids: Set[str] = set()
+        # Counters
+        self.source_rows = 0
+        self.embedded = 0
+        self.metadata_only = 0
+        self.unchanged = 0
+
+    def _get_model(self) -> SentenceTransformer:
+        if self.model is None:
+            logger.info(f"Loading NLP model for ETL: {self.model_name}...")
+            self.model = SentenceTransformer(self.model_name)
+            if ENCODE_PROCESSES > 1:
+                self.pool = self.model.start_multi_process_pool(target_devices=["cpu"] * ENCODE_PROCESSES)
+                logger.info(f"Started encode pool with {ENCODE_PROCESSES} processes.")
+            logger.info("NLP model loaded for ETL.")
+        return self.model
+
+    def process(self, df: pd.DataFrame) -> None:
+        self.source_rows += len(df)
+        with self.timer.stage("clean", len(df)):
+            faqs = clean_faq_frame(df)
+        if faqs.empty:
+            return
+        self.source_ids.update(faqs['question_id'])
+
+        with self.timer.stage("diff", len(faqs)):
+            stored = get_stored_faq_state(self.faqs_collection, faqs['question_id'].tolist())
+            needs_embedding, needs_update = diff_faqs(faqs, stored, self.model_name, self.storage_dtype)
+
+        changed = faqs[needs_embedding]
+        embedded_faqs: List[Dict[str, Any]] = []
+        if not changed.empty:
+            model = self._get_model()
+            with self.timer.stage("embed", len(changed)):
+                embeddings = encode_texts(model, changed['embedding_text'].tolist(), self.pool)
+            embedded_faqs = changed.drop(columns=['embedding_text']).to_dict('records')
+            for faq_doc, embedding in zip(embedded_faqs, embeddings):
+                faq_doc.update(encode_embedding(embedding, self.storage_dtype))
+                faq_doc['model_name'] = self.model_name
+        metadata_faqs = faqs.loc[needs_update, ['question_id', 'category']].to_dict('records')
+
+        processed_faqs = embedded_faqs + metadata_faqs
+        if processed_faqs:
+            # updated_at lets running API processes pick up just these FAQs (see services/faq_refresh.py)
+            updated_at = datetime.utcnow()
+            for faq_doc in processed_faqs:
+                faq_doc["updated_at"] = updated_at
+            with self.timer.stage("load", len(processed_faqs)):
+                bulk_upsert_faqs(self.faqs_collection, processed_faqs)
+
+        self.embedded += len(embedded_faqs)
+        self.metadata_only += len(metadata_faqs)
+        self.unchanged += len(faqs) - len(processed_faqs)
+        logger.debug(f"Chunk done: {len(df)} rows, {len(embedded_faqs)} embedded, {len(metadata_faqs)} metadata-only.")
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+
+def run_etl(faq_data_path: str, chunk_rows: int = ETL_CHUNK_ROWS):
     """
     Runs the ETL pipeline to ingest FAQ data into MongoDB.
-    This version includes the FAQ question text in the embedding for better matching
-    and appends or updates data in MongoDB (no deletion).
+    This version includes the FAQ question text in the embedding for better matching.
+    The run is incremental: each FAQ stores a content_hash of its embedding text
+    and the model_name it was embedded with, and only new or changed rows are
+    re-embedded and upserted. FAQs missing from the source are deleted.
+    The CSV is streamed in chunks of chunk_rows rows; each chunk is cleaned
+    vectorized, embedded in batches (optionally on a multi-process pool) and
+    written with bulk upserts before the next one is read.
     """
     logger.info("Starting ETL pipeline...")
     client = None
-    model = None
+    pipeline = None
     try:
         # --- 1. Connect to MongoDB ---
         logger.info("Connecting to MongoDB for ETL...")
@@ -37,59 +294,37 @@ def run_etl(faq_data_path: str):
         faqs_collection = db[FAQ_COLLECTION]
         logger.info("Connected to MongoDB for ETL.")
 
-        # --- 2. Load NLP Model ---
-        logger.info(f"Loading NLP model for ETL: {NLP_MODEL_NAME}...")
-        model = SentenceTransformer(NLP_MODEL_NAME)
-        logger.info("NLP model loaded for ETL.")
-
-        # --- 3. Extract Data ---
-        logger.info(f"Extracting data from {faq_data_path}...")
-        df = pd.read_csv(faq_data_path, keep_default_na=False)
-        logger.info(f"Extracted {len(df)} rows from CSV.")
-
-        # --- 4. Transform Data (Generate Embeddings & Clean) ---
-        processed_faqs = []
-        for _, row in df.iterrows():
-            faq_doc: Dict[str, Any] = {
-                "question_id": str(row['ID']),
-                "category": str(row['category']).strip(),
-                "question": str(row.get('Question', '')).strip(),
-                "answer_en": str(row['answer_en']).strip(),
-                "answer_hi": str(row['answer_hi']).strip(),
-                "keywords_en": [k.strip() for k in str(row['keywords_en']).split(',') if k.strip()],
-                "keywords_hi": [k.strip() for k in str(row['keywords_hi']).split(',') if k.strip()],
-                "embedding": []
-            }
-
-            # Compose embedding input text: include question + answers + keywords
-            text_for_embedding = " ".join([
-                faq_doc['question'],
-                faq_doc['answer_en'],
-                faq_doc['answer_hi'],
-                " ".join(faq_doc['keywords_en']),
-                " ".join(faq_doc['keywords_hi'])
-            ]).strip()
-
-            if not text_for_embedding:
-                logger.warning(f"Skipping FAQ ID {faq_doc['question_id']} due to missing text for embedding.")
-                continue
-
-            faq_doc['embedding'] = model.encode(text_for_embedding, convert_to_tensor=False).tolist()
-            processed_faqs.append(faq_doc)
-
-        logger.info(f"Transformed {len(processed_faqs)} unique FAQs with embeddings.")
-
-        # --- 5. Load Data: Upsert (Insert or Update) ---
-        if processed_faqs:
-            for faq_doc in processed_faqs:
-                faqs_collection.update_one(
-                    {"question_id": faq_doc["question_id"]},
-                    {"$set": faq_doc},
-                    upsert=True  # Insert if not found
-                )
-            logger.info(f"Successfully upserted {len(processed_faqs)} FAQs into MongoDB.")
-        else:
-            logger.warning("No FAQs to load after processing.")
+        # --- 2-4. Extract, Transform & Load, chunk by chunk ---
+        logger.info(f"Streaming data from {faq_data_path} in chunks of {chunk_rows} rows...")
+        pipeline = FAQChunkPipeline(faqs_collection)
+        chunks = read_faq_chunks(faq_data_path, chunk_rows)
+        while True:
+            with pipeline.timer.stage("extract", 0):
+                df = next(chunks, None)
+            if df is None:
+                break
+            pipeline.timer.rows["extract"] += len(df)
+            pipeline.process(df)
+        pipeline.timer.log()
+        logger.info(f"{pipeline.source_rows} source rows, {len(pipeline.source_ids)} FAQs: "
+                    f"{pipeline.embedded} new or changed, {pipeline.metadata_only} metadata-only changes, "
+                    f"{pipeline.unchanged} unchanged.")
+
+        # --- 5. Delete what vanished from the source ---
+        # Only FAQs this ETL wrote (they carry a content_hash) are deleted; ones added through the admin API stay.
+        vanished = sorted(qid for qid in get_etl_faq_ids(faqs_collection) if qid not in pipeline.source_ids)
+        if vanished and not ETL_DELETE_MISSING:
+            logger.info(f"Keeping {len(vanished)} FAQs missing from the source (ETL_DELETE_MISSING=false).")
+        elif vanished and not pipeline.source_ids:
+            logger.warning("Source produced no FAQs; refusing to delete every stored FAQ.")
+        elif vanished:
+            deleted = delete_missing_faqs(faqs_collection, vanished)
+            logger.info(f"Deleted {deleted} FAQs no longer in the source.")
+
+        # --- 6. Offline embedding snapshot and ANN index build (loaded from disk by the API at startup) ---
+        build_embedding_snapshot(faqs_collection)
+        if FAQ_INDEX_BACKEND == "ivf":
+            build_faq_index(faqs_collection)
 
     except FileNotFoundError:
         logger.error(f"FAQ data file not found at: {faq_data_path}")
@@ -98,6 +333,8 @@ def run_etl(faq_data_path: str):
     except Exception as e:
         logger.error(f"An error occurred during ETL: {e}", exc_info=True)
     finally:
+        if pipeline is not None:
+            pipeline.close()
         if client:
             client.close()
             logger.info("MongoDB connection closed for ETL.")
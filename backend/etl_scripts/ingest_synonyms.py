@@ -3,8 +3,9 @@ from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 import os
 import logging
+from datetime import datetime
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 
 # --- Configuration ---
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -13,15 +14,38 @@ MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME", "chatbot_db")
 KEYWORDS_COLLECTION = os.getenv("KEYWORDS_COLLECTION", "keywords")
 SYNONYMS_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'keywords_synonyms.csv')
+ETL_CHUNK_ROWS = int(os.getenv("ETL_CHUNK_ROWS", "5000"))  # source rows held in memory at once
 
 # --- Logging Setup ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def run_synonyms_etl(data_path: str):
+def read_synonym_chunks(data_path: str, chunk_rows: int = ETL_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Streams the synonyms CSV as DataFrames of at most chunk_rows rows."""
+    return pd.read_csv(data_path, keep_default_na=False, dtype=str, chunksize=max(1, chunk_rows))
+
+
+def clean_synonym_frame(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Column-wise cleaning of one CSV chunk into keyword documents; rows missing either keyword are dropped."""
+    split = lambda column: column.astype(str).str.split(',').map(lambda synonyms: [s.strip().lower() for s in synonyms])
+    docs = pd.DataFrame({
+        "english_keyword": df['english_keyword'].astype(str).str.strip().str.lower(),
+        "hindi_keyword": df['hindi_keyword'].astype(str).str.strip().str.lower(),
+        "english_synonyms": split(df['english_synonym']),
+        "hindi_synonyms": split(df['hindi_synonym']),
+    })
+    docs = docs[(docs['english_keyword'] != "") & (docs['hindi_keyword'] != "")]
+    return docs.to_dict('records')
+
+
+def run_synonyms_etl(data_path: str, chunk_rows: int = ETL_CHUNK_ROWS):
     """
     Runs the ETL pipeline to ingest synonyms data into MongoDB.
     This version handles the dual-lingual synonym CSV format.
+    The CSV is streamed in chunks of chunk_rows rows, each inserted before the
+    next is read. Every document of a run shares one updated_at stamp; once all
+    chunks are in, entries from earlier runs are deleted, so the collection is
+    replaced without ever being empty. A failed run removes its partial entries.
     """
     logger.info("Starting synonyms ETL pipeline...")
     client = None
@@ -34,35 +58,32 @@ def run_synonyms_etl(data_path: str):
         keywords_collection = db[KEYWORDS_COLLECTION]
         logger.info("Connected to MongoDB for synonyms ETL.")
 
-        # --- 2. Extract Data ---
-        logger.info(f"Extracting synonyms data from {data_path}...")
-        df = pd.read_csv(data_path, keep_default_na=False)
-        logger.info(f"Extracted {len(df)} rows from CSV.")
-
-        # --- 3. Transform Data & Clean ---
-        synonym_docs = []
-        for _, row in df.iterrows():
-            english_keyword = str(row['english_keyword']).strip().lower()
-            hindi_keyword = str(row['hindi_keyword']).strip().lower()
-            english_synonyms = [s.strip().lower() for s in str(row['english_synonym']).split(',')]
-            hindi_synonyms = [s.strip().lower() for s in str(row['hindi_synonym']).split(',')]
-            
-            if english_keyword and hindi_keyword:
-                doc = {
-                    "english_keyword": english_keyword,
-                    "hindi_keyword": hindi_keyword,
-                    "english_synonyms": english_synonyms,
-                    "hindi_synonyms": hindi_synonyms
-                }
-                synonym_docs.append(doc)
-        
-        logger.info(f"Transformed {len(synonym_docs)} synonym entries.")
+        # --- 2-4. Extract, Transform & Load, chunk by chunk ---
+        logger.info(f"Streaming synonyms data from {data_path} in chunks of {chunk_rows} rows...")
+        # updated_at lets running API processes notice the new synonym set
+        updated_at = datetime.utcnow()
+        source_rows = 0
+        loaded = 0
+        try:
+            for df in read_synonym_chunks(data_path, chunk_rows):
+                source_rows += len(df)
+                synonym_docs = clean_synonym_frame(df)
+                if not synonym_docs:
+                    continue
+                for doc in synonym_docs:
+                    doc["updated_at"] = updated_at
+                keywords_collection.insert_many(synonym_docs, ordered=False)
+                loaded += len(synonym_docs)
+        except Exception:
+            if loaded:
+                keywords_collection.delete_many({"updated_at": updated_at})
+                logger.warning(f"Removed {loaded} partially loaded synonym entries; previous set kept.")
+            raise
+        logger.info(f"Extracted {source_rows} rows from CSV, transformed {loaded} synonym entries.")
 
-        # --- 4. Load Data ---
-        if synonym_docs:
-            keywords_collection.delete_many({})
-            keywords_collection.insert_many(synonym_docs)
-            logger.info(f"Successfully loaded {len(synonym_docs)} synonym entries into MongoDB.")
+        if loaded:
+            replaced = keywords_collection.delete_many({"updated_at": {"$ne": updated_at}}).deleted_count
+            logger.info(f"Successfully loaded {loaded} synonym entries into MongoDB (replaced {replaced}).")
         else:
             logger.warning("No synonym entries to load.")
 
@@ -0,0 +1,32 @@
+# Pre-fork deployment: the NLP model and FAQ index are loaded once in the
+# gunicorn master and shared copy-on-write by every worker.
+#
+#   gunicorn -c backend/gunicorn.conf.py backend.main:app
+#
+# (uvicorn --workers spawns fresh interpreters, so each worker would load its own copy.)
+import os
+import shutil
+import tempfile
+
+# Prometheus metrics from every worker are aggregated through files in this
+# directory; it is emptied here, before the app (and its metrics) is imported.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR",
+                                    os.path.join(tempfile.gettempdir(), "kamgar_sahayak_metrics"))
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+
+def on_starting(server):
+    from backend.services.prefork import preload_shared_state
+    preload_shared_state()
+
+
+def child_exit(server, worker):
+    from backend.services.metrics import mark_worker_dead
+    mark_worker_dead(worker.pid)
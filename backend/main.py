@@ -6,6 +6,8 @@ from typing import Optional
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from backend.routes import login_router, chat_router, admin_router, register_router, otp_router
@@ -13,6 +15,12 @@ from backend.routes.admin_routes import router as admin_router
 
 from backend.db.mongo_utils import connect_to_mongo, close_mongo_connection, get_admin_user
 from backend.nlp.model_loader import load_nlp_model
+from backend.nlp.batcher import embedding_batcher
+from backend.nlp.reranker import reranker
+from backend.db.log_writer import log_writer
+from backend.services.metrics import MetricsMiddleware, render_metrics
+from backend.services.faq_refresh import start_faq_refresh, stop_faq_refresh
+from backend.nlp.synonyms import load_synonym_index, start_synonym_refresh, stop_synonym_refresh
 
 # --- Load Environment Variables ---
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
@@ -21,6 +29,7 @@ MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DB_NAME = os.getenv("DB_NAME", "chatbot_db")
 ADMIN_DB_NAME = os.getenv("ADMIN_DB_NAME", "admin_db")
 NLP_MODEL_NAME = os.getenv("NLP_MODEL_NAME", "paraphrase-multilingual-MiniLM-L12-v2")
+NLP_MODEL_PRELOAD = os.getenv("NLP_MODEL_PRELOAD", "true").lower() == "true"  # false: load on first query
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-super-secret-key-please-change-this-in-production")
 ALGORITHM = "HS256"
@@ -86,8 +95,12 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    # Paginated admin log endpoints return the next page's cursor in this header.
+    expose_headers=["X-Next-Cursor"]
 )
+# Request counts and latencies per route, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
 
 # --- Startup & Shutdown ---
 @app.on_event("startup")
@@ -96,8 +109,16 @@ async def startup_event():
         logger.info("Starting backend services...")
         await connect_to_mongo(MONGO_URI, DB_NAME, ADMIN_DB_NAME)
         logger.info("MongoDB connected.")
-        load_nlp_model(NLP_MODEL_NAME)
-        logger.info("NLP model loaded.")
+        if NLP_MODEL_PRELOAD:
+            load_nlp_model(NLP_MODEL_NAME)
+            logger.info("NLP model loaded.")
+            if reranker.enabled:
+                reranker.load()
+        start_faq_refresh()
+        logger.info("FAQ index loaded.")
+        load_synonym_index()
+        start_synonym_refresh()
+        logger.info("Synonym index loaded.")
     except Exception as e:
         logger.error(f"Startup failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Backend failed to start")
@@ -105,6 +126,11 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down backend...")
+    stop_faq_refresh()
+    await stop_synonym_refresh()
+    await embedding_batcher.close()
+    await log_writer.close()
+    logger.info(f"Embedding batcher stats: {embedding_batcher.stats()}")
     await close_mongo_connection()
     logger.info("MongoDB connection closed.")
 
@@ -119,3 +145,9 @@ app.include_router(otp_router, prefix="/otp_api", tags=["OTP"])
 @app.get("/")
 async def read_root():
     return {"message": "Shramik Saathi Chatbot Backend is running!"}
+
+# --- Metrics ---
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (all workers' metrics when PROMETHEUS_MULTIPROC_DIR is set)."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
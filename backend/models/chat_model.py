@@ -7,14 +7,32 @@ class ChatQuery(BaseModel):
     user_id: str = Field(..., description="Unique identifier for the user.")
     query_text: str = Field(..., min_length=1, description="The text query from the user.")
     language: str = Field("en", description="Language of the query (e.g., 'en', 'hi', 'hinglish').")
+    top_k: int = Field(1, ge=1, le=20, description="Number of ranked FAQ matches to return alongside the answer.")
+
+class SearchQuery(BaseModel):
+    query_text: str = Field(..., min_length=1, description="The text query to search the FAQs for.")
+    language: str = Field("en", description="Language to return answers in (e.g., 'en', 'hi').")
+    top_k: int = Field(5, ge=1, le=20, description="Number of FAQs to return.")
 
 # --- Response Models ---
+class FAQMatch(BaseModel):
+    question_id: Optional[str] = Field(None, description="ID of the matched FAQ.")
+    category: Optional[str] = Field(None, description="Category of the matched FAQ.")
+    question: Optional[str] = Field(None, description="The matched FAQ question.")
+    answer: str = Field(..., description="The FAQ answer in the requested language.")
+    similarity_score: float = Field(..., description="Cosine similarity between the query and the FAQ.")
+
 class ChatResponse(BaseModel):
     bot_response: str = Field(..., description="The chatbot's response text.")
     status: str = Field(..., description="Status of the query (e.g., 'answered', 'unanswered', 'error').")
     language: str = Field(..., description="Language of the bot's response.")
     query_id: Optional[str] = Field(None, description="Optional ID for the processed query.")
     similarity_score: Optional[float] = Field(None, description="Cosine similarity score if answered by NLP.")
+    matches: Optional[List[FAQMatch]] = Field(None, description="Ranked FAQ matches when top_k > 1 (\"did you mean\" alternatives).")
+
+class SearchResponse(BaseModel):
+    language: str = Field(..., description="Language of the returned answers.")
+    results: List[FAQMatch] = Field(..., description="FAQs ranked by similarity, best first.")
 
 # --- Logging Models ---
 class LogEntry(BaseModel):
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.nlp.model_loader import get_model
+from backend.nlp.inference_pool import INFERENCE_POOL_SIZE, run_inference
+from backend.services.metrics import (EMBEDDING_BATCH_SECONDS, EMBEDDING_BATCH_SIZE,
+                                      EMBEDDING_QUEUE_DELAY_SECONDS)
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+
+class EmbeddingBatcher:
+    """
+    Dynamic micro-batching for query embeddings.
+    Concurrent callers enqueue their text and await a future. A collector waits
+    for a free inference slot, gathers requests for up to max_wait_ms (or until
+    max_batch_size are waiting), and hands the batch to the inference pool for
+    one batched model.encode that resolves every caller's future. While all
+    slots are busy, new requests queue up and form the next batch, so batch
+    size grows with load. There is one slot per inference pool thread.
+    """
+
+    def __init__(self, max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE,
+                 max_wait_ms: float = EMBEDDING_BATCH_MAX_WAIT_MS, workers: int = INFERENCE_POOL_SIZE):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes: Counter = Counter()
+        self.queue_delay_total = 0.0
+        self.queue_delay_max = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Returns the embedding of text, computed as part of a batch."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((text, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future, float]]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        slots = asyncio.Semaphore(self.workers)
+        pending = set()
+        try:
+            while True:
+                await slots.acquire()
+                batch = await self._collect()
+                batch = [item for item in batch if not item[1].done()]  # drop cancelled callers
+                if not batch:
+                    slots.release()
+                    continue
+                task = asyncio.get_running_loop().create_task(self._process(batch))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _process(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            delay = started - enqueued
+            self.queue_delay_total += delay
+            self.queue_delay_max = max(self.queue_delay_max, delay)
+            EMBEDDING_QUEUE_DELAY_SECONDS.observe(delay)
+        self.batches += 1
+        self.items += len(batch)
+        self.batch_sizes[len(batch)] += 1
+        EMBEDDING_BATCH_SIZE.observe(len(batch))
+
+        # Identical texts in one batch are encoded once.
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        try:
+            with EMBEDDING_BATCH_SECONDS.time():
+                embeddings = await run_inference(self._encode, texts)
+        except Exception as e:
+            logger.error(f"Batched embedding of {len(texts)} text(s) failed: {e}", exc_info=True)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        by_text = dict(zip(texts, embeddings))
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    @staticmethod
+    def _encode(texts: List[str]) -> np.ndarray:
+        model = get_model()
+        if model is None:
+            raise RuntimeError("NLP model is not loaded. Cannot generate embeddings.")
+        return np.asarray(model.encode(texts, batch_size=len(texts), convert_to_tensor=False), dtype=np.float32)
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "avg_queue_delay_ms": 1000 * self.queue_delay_total / self.items if self.items else 0.0,
+            "max_queue_delay_ms": 1000 * self.queue_delay_max,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+# Global batcher instance
+embedding_batcher = EmbeddingBatcher()
@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.nlp.quantization import FAQ_INDEX_DTYPE, check_dtype, quantize
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Binary FAQ embedding snapshot written by the ETL; empty disables it.
+FAQ_SNAPSHOT_PATH = os.getenv("FAQ_SNAPSHOT_PATH",
+                              os.path.join(os.path.dirname(__file__), '..', 'data', 'faq_embeddings.bin'))
+NLP_MODEL_NAME = os.getenv("NLP_MODEL_NAME", "paraphrase-multilingual-MiniLM-L12-v2")
+
+# File layout:
+#   [0, 8)                 MAGIC
+#   [8, HEADER_SIZE)       JSON header, NUL padded
+#   [HEADER_SIZE, ...)     count x dim row-normalized matrix in header dtype (page aligned)
+#   [scales_offset, ...)   count float32 per-row scales (int8 snapshots only)
+#   [ids_offset, ...)      JSON list of question_ids, one per matrix row
+MAGIC = b"FAQEMB\x00\x01"
+HEADER_SIZE = 4096
+FORMAT_VERSION = 1
+
+# Rows buffered before each write while streaming a snapshot to disk.
+WRITE_CHUNK_ROWS = 4096
+
+
+class EmbeddingSnapshot:
+    """
+    A memory-mapped FAQ embedding snapshot.
+    The matrix is mapped copy-on-write: pages are shared through the OS page
+    cache by every process on the host that maps the same file, and only the
+    pages a process later modifies (an upserted or moved row) become private.
+    """
+
+    def __init__(self, path: str, header: Dict[str, Any], ids: List[str], matrix: np.ndarray,
+                 scales: np.ndarray):
+        self.path = path
+        self.header = header
+        self.ids = ids
+        self.matrix = matrix
+        self.scales = scales
+        self.rows: Dict[str, int] = {question_id: row for row, question_id in enumerate(ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, question_id: str) -> bool:
+        return question_id in self.rows
+
+    @property
+    def model_name(self) -> str:
+        return self.header["model_name"]
+
+    @property
+    def dim(self) -> int:
+        return self.header["dim"]
+
+    @property
+    def version(self) -> int:
+        return self.header["version"]
+
+    @property
+    def dtype(self) -> str:
+        return self.header["dtype"]
+
+    @property
+    def built_at(self) -> datetime:
+        return datetime.fromisoformat(self.header["built_at"])
+
+    @classmethod
+    def open(cls, path: str) -> "EmbeddingSnapshot":
+        """
+        Maps a snapshot file.
+        Raises:
+            ValueError: If the file is not a snapshot this version can read
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an FAQ embedding snapshot")
+            header = json.loads(f.read(HEADER_SIZE - len(MAGIC)).rstrip(b"\0").decode("utf-8"))
+            if header.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported FAQ snapshot format {header.get('format_version')} in {path}")
+            f.seek(header["ids_offset"])
+            ids = json.loads(f.read(header["ids_length"]).decode("utf-8"))
+        count, dim = header["count"], header["dim"]
+        dtype = np.dtype(check_dtype(header["dtype"]))
+        if count:
+            matrix = np.memmap(path, dtype=dtype, mode="c", offset=header["matrix_offset"], shape=(count, dim))
+        else:
+            matrix = np.zeros((0, dim), dtype=dtype)
+        if count and header.get("scales_offset") is not None:
+            scales = np.memmap(path, dtype=np.float32, mode="c", offset=header["scales_offset"], shape=(count,))
+        else:
+            scales = np.ones(count, dtype=np.float32)
+        return cls(path, header, ids, matrix, scales)
+
+
+def _write_header(f, header: Dict[str, Any]) -> None:
+    encoded = json.dumps(header).encode("utf-8")
+    if len(encoded) > HEADER_SIZE - len(MAGIC):
+        raise ValueError("FAQ snapshot header too large")
+    f.seek(0)
+    f.write(MAGIC + encoded.ljust(HEADER_SIZE - len(MAGIC), b"\0"))
+
+
+def write_snapshot(path: str, rows: Iterable[Tuple[str, Sequence[float]]],
+                   model_name: str = NLP_MODEL_NAME, dtype: str = FAQ_INDEX_DTYPE) -> Dict[str, Any]:
+    """
+    Streams (question_id, embedding) pairs into a snapshot file. Rows are
+    normalized and written in chunks, so memory stays bounded by the chunk size
+    plus the id table. The file is written next to path and swapped in
+    atomically; processes that already mapped the old file keep their view.
+    Args:
+        path: Destination file
+        rows: (question_id, embedding) pairs, e.g. from a Mongo cursor
+        model_name: Model the embeddings were produced with
+        dtype: Row storage ('float32', 'float16' or 'int8'); matching the API's
+            FAQ_INDEX_DTYPE lets it use the mapped rows without conversion
+    Returns:
+        The header written
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    check_dtype(dtype)
+    ids: List[str] = []
+    scales: List[np.ndarray] = []
+    dim: Optional[int] = None
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * HEADER_SIZE)
+        buffer: List[Sequence[float]] = []
+
+        def flush() -> None:
+            vectors = np.asarray(buffer, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            values, row_scales = quantize(vectors / norms, dtype)
+            f.write(values.tobytes())
+            scales.append(row_scales)
+            buffer.clear()
+
+        for question_id, embedding in rows:
+            if dim is None:
+                dim = len(embedding)
+            elif len(embedding) != dim:
+                logger.warning(f"FAQ {question_id} has embedding of size {len(embedding)}, expected {dim}. Skipping.")
+                continue
+            ids.append(question_id)
+            buffer.append(embedding)
+            if len(buffer) >= WRITE_CHUNK_ROWS:
+                flush()
+        if buffer:
+            flush()
+
+        scales_offset = None
+        if dtype == "int8" and ids:
+            scales_offset = f.tell()
+            f.write(np.concatenate(scales).astype(np.float32).tobytes())
+        encoded_ids = json.dumps(ids, ensure_ascii=False).encode("utf-8")
+        ids_offset = f.tell()
+        f.write(encoded_ids)
+        built_at = datetime.utcnow()
+        header = {
+            "format_version": FORMAT_VERSION,
+            "model_name": model_name,
+            "dim": dim or 0,
+            "count": len(ids),
+            "dtype": dtype,
+            "version": int(built_at.timestamp() * 1000),
+            "built_at": built_at.isoformat(),
+            "matrix_offset": HEADER_SIZE,
+            "scales_offset": scales_offset,
+            "ids_offset": ids_offset,
+            "ids_length": len(encoded_ids),
+        }
+        _write_header(f, header)
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote {dtype} FAQ embedding snapshot with {len(ids)} rows (dim={dim}) to {path}")
+    return header
+
+
+def load_snapshot(path: str = FAQ_SNAPSHOT_PATH, model_name: str = NLP_MODEL_NAME) -> Optional[EmbeddingSnapshot]:
+    """
+    Maps the snapshot at path if it exists and was built with model_name.
+    Returns:
+        None if snapshots are disabled, missing, unreadable or for another model
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        snapshot = EmbeddingSnapshot.open(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable FAQ embedding snapshot at {path}: {e}")
+        return None
+    if snapshot.model_name != model_name:
+        logger.warning(f"FAQ embedding snapshot at {path} was built for {snapshot.model_name}, not {model_name}; ignoring.")
+        return None
+    logger.info(f"Mapped FAQ embedding snapshot {path}: {len(snapshot)} rows, dim={snapshot.dim}, "
+                f"version={snapshot.version}.")
+    return snapshot
@@ -0,0 +1,127 @@
+import logging
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+FAQ_EXACT_MATCH = os.getenv("FAQ_EXACT_MATCH", "true").lower() == "true"
+# Shorter transliteration keys ("pf", "esi") collide too easily to be trusted.
+FAQ_EXACT_MIN_KEY_LENGTH = int(os.getenv("FAQ_EXACT_MIN_KEY_LENGTH", "8"))
+# Different questions can share a consonant skeleton ("who can apply" / "how can apply"),
+# so a transliteration match is only answered if the query's embedding agrees this much.
+FAQ_TRANSLIT_MIN_SIMILARITY = float(os.getenv("FAQ_TRANSLIT_MIN_SIMILARITY", "0.8"))
+
+# Devanagari consonants and signs mapped to the Latin letter a Hinglish spelling of
+# them most likely reduces to; vowels and vowel signs are dropped, like Latin vowels.
+# Nukta forms (क़, ज़, फ़ ...) decompose under NFKC, so their base letter is enough.
+_DEVANAGARI = {
+    "क": "k", "ख": "k", "ग": "g", "घ": "g", "ङ": "n",
+    "च": "c", "छ": "c", "ज": "j", "झ": "j", "ञ": "n",
+    "ट": "t", "ठ": "t", "ड": "d", "ढ": "d", "ण": "n",
+    "त": "t", "थ": "t", "द": "d", "ध": "d", "न": "n",
+    "प": "p", "फ": "f", "ब": "b", "भ": "b", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "व": "v", "श": "s", "ष": "s", "स": "s", "ह": "h",
+    "ऋ": "r", "ृ": "r", "ं": "n", "ँ": "n",
+}
+_LATIN = str.maketrans({"w": "v", "z": "j", "q": "k", "x": "ks"})
+_ASPIRATE_RE = re.compile(r"(?<=[bcdgjkpst])h")   # bh, ch, dh, gh, jh, kh, ph, sh, th -> b, c, d ...
+_VOWELS_RE = re.compile(r"[aeiou\s]+")
+_REPEATS_RE = re.compile(r"(.)\1+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of a question for exact matching: NFKC, case-folded, with
+    punctuation (including the Devanagari danda) and format characters such as
+    zero-width joiners removed and whitespace collapsed.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = "".join(" " if unicodedata.category(char)[0] == "P" else char
+                   for char in text if unicodedata.category(char) != "Cf")
+    return " ".join(text.split())
+
+
+def transliteration_key(text: str) -> str:
+    """
+    Script-independent consonant skeleton of normalized text, so that "मजदूरी",
+    "majdoori" and "mazduri" share a key. Devanagari is romanized letter by
+    letter, aspiration and vowels are dropped and repeated letters collapsed.
+    """
+    letters = []
+    for char in text:
+        if char in _DEVANAGARI:
+            # The inherent vowel keeps ह from reading as aspiration of the previous letter.
+            letters.append(_DEVANAGARI[char] + ("" if char in "ृंँ" else "a"))
+        elif char.isdigit():
+            letters.append(str(unicodedata.digit(char)))
+        elif char.isascii():
+            letters.append(char)
+    latin = _ASPIRATE_RE.sub("", "".join(letters)).translate(_LATIN)
+    return _REPEATS_RE.sub(r"\1", _VOWELS_RE.sub("", latin))
+
+
+class ExactMatchIndex:
+    """
+    Hash lookup from normalized question text, and from its transliteration key,
+    to the FAQ it belongs to. A key shared by several FAQs is ambiguous and never
+    matches. Not thread-safe on its own: FAQIndex updates and queries it under its lock.
+    """
+
+    def __init__(self, min_key_length: int = FAQ_EXACT_MIN_KEY_LENGTH):
+        self.min_key_length = min_key_length
+        self._texts: Dict[str, Set[str]] = {}   # normalized question -> question_ids
+        self._keys: Dict[str, Set[str]] = {}    # transliteration key -> question_ids
+        self._entries: Dict[str, tuple] = {}    # question_id -> (normalized question, key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def upsert(self, faqs: Iterable[Dict[str, Any]]) -> None:
+        for faq in faqs:
+            question_id = faq.get("question_id")
+            if question_id is None:
+                continue
+            self._drop(question_id)
+            text = normalize_text(str(faq.get("question") or ""))
+            if not text:
+                continue
+            key = transliteration_key(text)
+            self._texts.setdefault(text, set()).add(question_id)
+            if len(key) >= self.min_key_length:
+                self._keys.setdefault(key, set()).add(question_id)
+            self._entries[question_id] = (text, key)
+
+    def _drop(self, question_id: str) -> None:
+        entry = self._entries.pop(question_id, None)
+        if entry is None:
+            return
+        for table, value in zip((self._texts, self._keys), entry):
+            owners = table.get(value)
+            if owners is not None:
+                owners.discard(question_id)
+                if not owners:
+                    del table[value]
+
+    def remove(self, question_ids: Iterable[str]) -> None:
+        for question_id in question_ids:
+            self._drop(question_id)
+
+    def lookup(self, query_text: str) -> Optional[Tuple[str, bool]]:
+        """
+        The one FAQ whose question matches the query exactly or up to transliteration.
+        Returns:
+            (question_id, transliterated), transliterated being True when only the
+            transliteration keys matched; None if no single FAQ matches
+        """
+        text = normalize_text(query_text)
+        owners, transliterated = self._texts.get(text), False
+        if not owners:
+            key = transliteration_key(text)
+            owners = self._keys.get(key) if len(key) >= self.min_key_length else None
+            transliterated = True
+        if owners and len(owners) == 1:
+            return next(iter(owners)), transliterated
+        return None
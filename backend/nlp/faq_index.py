@@ -0,0 +1,716 @@
+import heapq
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.nlp.embedding_store import EmbeddingSnapshot
+from backend.nlp.exact_match import FAQ_EXACT_MATCH, ExactMatchIndex
+from backend.nlp.lexical_index import BM25Index
+from backend.nlp.quantization import FAQ_INDEX_DTYPE, check_dtype, decode_embedding, dequantize, has_embedding, quantize
+
+logger = logging.getLogger(__name__)
+
+# Fields kept next to each embedding row. Everything else on the FAQ document
+# (notably the raw embedding list) is dropped once the matrix is built.
+META_FIELDS = ("question_id", "category", "question", "answer_en", "answer_hi")
+
+# --- Configuration ---
+FAQ_INDEX_BACKEND = os.getenv("FAQ_INDEX_BACKEND", "exact")  # exact | ivf
+FAQ_INDEX_PATH = os.getenv("FAQ_INDEX_PATH", os.path.join(os.path.dirname(__file__), '..', 'data', 'faq_index.npz'))
+FAQ_IVF_NLIST = int(os.getenv("FAQ_IVF_NLIST", "0"))        # 0: ~4*sqrt(N) lists
+FAQ_IVF_NPROBE = int(os.getenv("FAQ_IVF_NPROBE", "0"))      # lists scanned per query; 0: nlist / 4
+FAQ_ANN_MIN_SIZE = int(os.getenv("FAQ_ANN_MIN_SIZE", "20000"))  # below this, exact search is used
+NLP_MODEL_NAME = os.getenv("NLP_MODEL_NAME", "paraphrase-multilingual-MiniLM-L12-v2")
+# Quantized (float16/int8) rows are upcast to float32 this many at a time while scoring.
+FAQ_SCORE_BLOCK_ROWS = int(os.getenv("FAQ_SCORE_BLOCK_ROWS", "8192"))
+
+# Hybrid retrieval (opt-in): a BM25 index over FAQ questions and keywords is kept
+# next to the embeddings. Its scores, mapped to [0, 1) by bm25 / (bm25 + saturation),
+# are blended into the cosine scores with this weight to re-order matches; the
+# reported (and thresholded) score stays the cosine. 0 disables lexical scoring.
+FAQ_LEXICAL_WEIGHT = float(os.getenv("FAQ_LEXICAL_WEIGHT", "0"))
+FAQ_LEXICAL_SATURATION = float(os.getenv("FAQ_LEXICAL_SATURATION", "10"))  # BM25 score that maps to 0.5
+# With the prefilter on, only the FAQ_LEXICAL_SHORTLIST best BM25 matches are scored
+# densely, once the index holds FAQ_LEXICAL_PREFILTER_MIN_SIZE FAQs; queries with
+# fewer than top_k lexical matches still fall back to a full dense search.
+FAQ_LEXICAL_PREFILTER = os.getenv("FAQ_LEXICAL_PREFILTER", "false").lower() == "true"
+FAQ_LEXICAL_SHORTLIST = int(os.getenv("FAQ_LEXICAL_SHORTLIST", "200"))
+FAQ_LEXICAL_PREFILTER_MIN_SIZE = int(os.getenv("FAQ_LEXICAL_PREFILTER_MIN_SIZE", "5000"))
+
+# Minimum number of rows allocated up front in the delta segment so small
+# incremental inserts do not reallocate it every time.
+MIN_CAPACITY = 64
+
+
+def faq_embedding_text(faq: Dict[str, Any]) -> str:
+    """
+    Composes the text an FAQ is embedded from: question + answers + keywords.
+    Shared by the ETL and the admin API so both produce comparable embeddings.
+    """
+    return " ".join([
+        faq.get('question', ''),
+        faq.get('answer_en', ''),
+        faq.get('answer_hi', ''),
+        " ".join(faq.get('keywords_en', [])),
+        " ".join(faq.get('keywords_hi', []))
+    ]).strip()
+
+
+class FAQIndex:
+    """
+    Process-resident FAQ embedding index.
+    Embeddings are held as row-normalized matrix rows, so scoring a query
+    against every FAQ is a (blocked) matrix-vector product. Rows can be inserted,
+    replaced or removed in place without rebuilding the rest of the matrix.
+    Rows live in two segments: a fixed-size base (the memory-mapped snapshot,
+    when built from one) followed by a private, growable delta that takes new
+    rows. Growing the index only reallocates the delta, so the base stays
+    shared copy-on-write across processes; only a base row that is replaced or
+    overwritten by a removal makes its page private.
+    The matrix is float32 by default; with dtype 'float16' or 'int8' (one
+    float32 scale per row) it takes 2x or ~4x less memory and queries are
+    scored block by block straight from the quantized rows.
+    Unless lexical_weight is 0, a BM25 index over the same FAQs is updated
+    alongside the matrix and searches given the query text fuse both scores.
+    With exact_match, normalized questions are also hashed so verbatim and
+    transliterated repeats of a question are found without an embedding.
+    """
+
+    def __init__(self, dim: Optional[int] = None, dtype: str = FAQ_INDEX_DTYPE,
+                 lexical_weight: float = FAQ_LEXICAL_WEIGHT, lexical_prefilter: bool = FAQ_LEXICAL_PREFILTER,
+                 exact_match: bool = FAQ_EXACT_MATCH):
+        self.dim = dim
+        self.dtype = check_dtype(dtype)
+        self.version = 0
+        self.meta: List[Dict[str, Any]] = []
+        self._data = np.zeros((0, dim or 0), dtype=self.dtype)      # base segment
+        self._scales = np.ones(0, dtype=np.float32)
+        self._delta = np.zeros((0, dim or 0), dtype=self.dtype)     # delta segment, rows after the base
+        self._delta_scales = np.ones(0, dtype=np.float32)
+        self._rows: Dict[str, int] = {}
+        self.lexical_weight = lexical_weight
+        self.lexical_prefilter = lexical_prefilter
+        self.lexical: Optional[BM25Index] = BM25Index() if lexical_weight > 0 or lexical_prefilter else None
+        self.exact: Optional[ExactMatchIndex] = ExactMatchIndex() if exact_match else None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.meta)
+
+    def __contains__(self, question_id: str) -> bool:
+        return question_id in self._rows
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the live embedding rows and their scales."""
+        row_bytes = (self.dim or 0) * np.dtype(self.dtype).itemsize + (4 if self.dtype == "int8" else 0)
+        return len(self.meta) * row_bytes
+
+    @property
+    def capacity(self) -> int:
+        """Rows the base and delta segments can hold together."""
+        return self._data.shape[0] + self._delta.shape[0]
+
+    def _gather(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Stored values and scales of the given rows, from whichever segment holds them."""
+        base = self._data.shape[0]
+        in_base = rows < base
+        if in_base.all():
+            return self._data[rows], self._scales[rows]
+        if not in_base.any():
+            return self._delta[rows - base], self._delta_scales[rows - base]
+        values = np.empty((len(rows), self.dim), dtype=self.dtype)
+        scales = np.empty(len(rows), dtype=np.float32)
+        values[in_base], scales[in_base] = self._data[rows[in_base]], self._scales[rows[in_base]]
+        delta = rows[~in_base] - base
+        values[~in_base], scales[~in_base] = self._delta[delta], self._delta_scales[delta]
+        return values, scales
+
+    def _block(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Stored values and scales of the live rows start..end, as views where they lie in one segment."""
+        base = self._data.shape[0]
+        if end <= base:
+            return self._data[start:end], self._scales[start:end]
+        if start >= base:
+            return self._delta[start - base:end - base], self._delta_scales[start - base:end - base]
+        return self._gather(np.arange(start, end))
+
+    def _write(self, rows: np.ndarray, values: np.ndarray, scales: np.ndarray) -> None:
+        base = self._data.shape[0]
+        in_base = rows < base
+        self._data[rows[in_base]], self._scales[rows[in_base]] = values[in_base], scales[in_base]
+        delta = rows[~in_base] - base
+        self._delta[delta], self._delta_scales[delta] = values[~in_base], scales[~in_base]
+
+    def vectors(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """The live rows (or a subset) as float32, dequantizing if needed."""
+        if rows is None:
+            rows = np.arange(len(self.meta))
+        return dequantize(*self._gather(np.asarray(rows, dtype=np.int64)))
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """Scales each row to unit length (zero rows are left as zeros)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _accept(self, faq: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Returns the FAQ document's embedding (plain or quantized) if usable,
+        fixing dim on first sight; None if it is missing or the wrong size.
+        """
+        embedding = decode_embedding(faq)
+        if embedding is None or not embedding.size:
+            logger.warning(f"FAQ with ID {faq.get('question_id', 'N/A')} missing embedding. Skipping.")
+            return None
+        if self.dim is None:
+            self.dim = len(embedding)
+        elif len(embedding) != self.dim:
+            logger.warning(f"FAQ with ID {faq.get('question_id', 'N/A')} has embedding of size "
+                           f"{len(embedding)}, expected {self.dim}. Skipping.")
+            return None
+        return embedding
+
+    def _reserve(self, size: int) -> None:
+        """Grows the delta segment (doubling) so both segments hold at least size rows; the base is never copied."""
+        if self._data.shape[1] != self.dim:  # dim was unknown until the first embedding arrived
+            self._data = np.zeros((0, self.dim), dtype=self.dtype)
+            self._scales = np.ones(0, dtype=np.float32)
+        if size <= self.capacity and self._delta.shape[1] == self.dim:
+            return
+        base = self._data.shape[0]
+        new_capacity = max(MIN_CAPACITY, self._delta.shape[0] * 2, size - base)
+        delta = np.zeros((new_capacity, self.dim), dtype=self.dtype)
+        scales = np.ones(new_capacity, dtype=np.float32)
+        live = max(0, len(self.meta) - base)
+        if self._delta.shape[1] == self.dim:
+            delta[:live] = self._delta[:live]
+            scales[:live] = self._delta_scales[:live]
+        self._delta = delta
+        self._delta_scales = scales
+
+    def build(self, faqs: Iterable[Dict[str, Any]]) -> None:
+        """
+        Builds the matrix and metadata from FAQ documents as stored in MongoDB,
+        replacing anything already in the index.
+        Args:
+            faqs: FAQ documents, each carrying an 'embedding' list (or a quantized 'embedding_q')
+        """
+        with self._lock:
+            self.meta = []
+            self._rows = {}
+            self._data = np.zeros((0, self.dim or 0), dtype=self.dtype)
+            self._scales = np.ones(0, dtype=np.float32)
+            self._delta = np.zeros((0, self.dim or 0), dtype=self.dtype)
+            self._delta_scales = np.ones(0, dtype=np.float32)
+            self._reset_text_indexes()
+            self.upsert(faqs)
+            self._seal()
+            logger.info(f"Built FAQ index with {len(self.meta)} entries (dim={self.dim}).")
+
+    def _seal(self) -> None:
+        """
+        Turns the rows built so far into the base segment (a view, nothing is
+        copied), so later growth allocates a fresh delta instead of copying them;
+        with pre-forked workers the base then stays shared with the master.
+        """
+        count = len(self.meta)
+        if self._data.shape[0] == 0 and count:
+            self._data, self._scales = self._delta[:count], self._delta_scales[:count]
+            self._delta = np.zeros((0, self.dim), dtype=self.dtype)
+            self._delta_scales = np.ones(0, dtype=np.float32)
+
+    def build_from_snapshot(self, snapshot: EmbeddingSnapshot, faqs: Iterable[Dict[str, Any]]) -> None:
+        """
+        Builds the index on top of a memory-mapped embedding snapshot instead of
+        decoding embeddings from FAQ documents. The mapped matrix is used in place
+        as the base segment, so its pages stay shared with other processes mapping
+        the same file, unless the snapshot was written in another dtype, in which
+        case its rows are converted into private memory.
+        Args:
+            snapshot: Snapshot written by the ETL for the serving model
+            faqs: FAQ documents (embedding field optional). Documents carrying an
+                embedding are upserted over the snapshot row; FAQs without one take
+                their row from the snapshot; snapshot rows with no FAQ are dropped.
+        """
+        with self._lock:
+            self.dim = snapshot.dim
+            if snapshot.dtype == self.dtype:
+                self._data, self._scales = snapshot.matrix, snapshot.scales
+            else:
+                logger.info(f"Converting {snapshot.dtype} embedding snapshot to a {self.dtype} FAQ index.")
+                self._data = np.zeros((len(snapshot), self.dim), dtype=self.dtype)
+                self._scales = np.ones(len(snapshot), dtype=np.float32)
+                for start in range(0, len(snapshot), FAQ_SCORE_BLOCK_ROWS):
+                    block = slice(start, start + FAQ_SCORE_BLOCK_ROWS)
+                    self._data[block], self._scales[block] = quantize(
+                        dequantize(snapshot.matrix[block], snapshot.scales[block]), self.dtype)
+            self._delta = np.zeros((0, self.dim), dtype=self.dtype)
+            self._delta_scales = np.ones(0, dtype=np.float32)
+            self.meta = [{"question_id": question_id} for question_id in snapshot.ids]
+            self._rows = dict(snapshot.rows)
+            self._reset_text_indexes()
+            embedded, seen = [], set()
+            for faq in faqs:
+                question_id = faq.get("question_id")
+                seen.add(question_id)
+                if has_embedding(faq):
+                    embedded.append(faq)
+                elif question_id in self._rows:
+                    self.meta[self._rows[question_id]] = {field: faq.get(field) for field in META_FIELDS}
+                    for text_index in self._text_indexes():
+                        text_index.upsert([faq])
+                else:
+                    logger.warning(f"FAQ with ID {question_id} is not in the embedding snapshot and has no embedding. Skipping.")
+            self.remove([question_id for question_id in snapshot.ids if question_id not in seen])
+            self.upsert(embedded)
+            logger.info(f"Built FAQ index with {len(self.meta)} entries (dim={self.dim}) from snapshot "
+                        f"{snapshot.path}; {len(embedded)} embeddings taken from documents.")
+
+    def populate(self, faqs: Iterable[Dict[str, Any]], snapshot: Optional[EmbeddingSnapshot] = None) -> None:
+        """Builds from the snapshot when one is given, otherwise from the documents' embeddings."""
+        if snapshot is None:
+            self.build(faqs)
+        else:
+            self.build_from_snapshot(snapshot, faqs)
+
+    def upsert(self, faqs: Iterable[Dict[str, Any]]) -> int:
+        """
+        Inserts new FAQs and replaces existing ones (matched on question_id).
+        Only the affected rows are normalized and written.
+        Returns:
+            Number of FAQs applied
+        """
+        with self._lock:
+            accepted, embeddings = [], []
+            for faq in faqs:
+                embedding = self._accept(faq)
+                if embedding is not None:
+                    accepted.append(faq)
+                    embeddings.append(embedding)
+            if not accepted:
+                return 0
+            vectors = self.normalize(np.array(embeddings, dtype=np.float32))
+            new_ids = {faq.get("question_id") for faq in accepted} - self._rows.keys()
+            self._reserve(len(self.meta) + len(new_ids))
+
+            rows = np.empty(len(accepted), dtype=np.int64)
+            for i, faq in enumerate(accepted):
+                question_id = faq.get("question_id")
+                row = self._rows.get(question_id)
+                if row is None:
+                    row = len(self.meta)
+                    self._rows[question_id] = row
+                    self.meta.append({})
+                self.meta[row] = {field: faq.get(field) for field in META_FIELDS}
+                rows[i] = row
+            self._write(rows, *quantize(vectors, self.dtype))
+            self._rows_written(rows, vectors)
+            for text_index in self._text_indexes():
+                text_index.upsert(accepted)
+            self.version += 1
+            return len(accepted)
+
+    def _text_indexes(self) -> List[Any]:
+        """The enabled indexes over FAQ text, kept in step with the rows."""
+        return [index for index in (self.lexical, self.exact) if index is not None]
+
+    def _reset_text_indexes(self) -> None:
+        if self.lexical is not None:
+            self.lexical = BM25Index()
+        if self.exact is not None:
+            self.exact = ExactMatchIndex()
+
+    def _rows_written(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Hook for subclasses that keep per-row state alongside the matrix."""
+
+    def _move_row(self, src: int, dst: int) -> None:
+        rows = np.array([dst], dtype=np.int64)
+        self._write(rows, *self._gather(np.array([src], dtype=np.int64)))
+
+    def remove(self, question_ids: Iterable[str]) -> int:
+        """
+        Removes FAQs by question_id, moving the last row into each freed slot.
+        Returns:
+            Number of FAQs actually removed
+        """
+        removed = 0
+        with self._lock:
+            for question_id in question_ids:
+                row = self._rows.pop(question_id, None)
+                if row is None:
+                    continue
+                last = len(self.meta) - 1
+                if row != last:
+                    self._move_row(last, row)
+                    self.meta[row] = self.meta[last]
+                    self._rows[self.meta[row]["question_id"]] = row
+                self.meta.pop()
+                for text_index in self._text_indexes():
+                    text_index.remove([question_id])
+                removed += 1
+            if removed:
+                self.version += 1
+        return removed
+
+    def exact_match(self, query_text: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        The FAQ whose question equals the query after normalization (Unicode, case,
+        punctuation) or transliteration, if exactly one does.
+        Returns:
+            (faq metadata, transliterated); a transliterated match is a candidate
+            only, to be confirmed with similarity()
+        """
+        with self._lock:
+            if self.exact is None:
+                return None
+            match = self.exact.lookup(query_text)
+            if match is None:
+                return None
+            question_id, transliterated = match
+            return self.meta[self._rows[question_id]], transliterated
+
+    def similarity(self, question_id: str, query_embedding: List[float]) -> Optional[float]:
+        """Cosine similarity between a query embedding and one FAQ, None if the FAQ is not indexed."""
+        with self._lock:
+            row = self._rows.get(question_id)
+            query = np.asarray(query_embedding, dtype=np.float32)
+            query_norm = np.linalg.norm(query)
+            if row is None or query_norm == 0:
+                return None
+            return float(self._score(query / query_norm, np.array([row], dtype=np.int64))[0])
+
+    def search(self, query_embedding: List[float], top_k: int = 1,
+               query_text: Optional[str] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Returns the top_k FAQs by cosine similarity, best first.
+        Args:
+            query_embedding: Embedding of the (expanded) user query
+            top_k: Number of matches to return
+            query_text: The (expanded) query text; when given, BM25 scores are fused
+                into the ranking and, with the lexical prefilter on, restrict which
+                FAQs are scored
+        Returns:
+            List of (faq metadata, cosine similarity) tuples, ordered by the fused
+            score when lexical scoring applies
+        """
+        with self._lock:
+            if not self.meta or top_k <= 0:
+                return []
+            query = np.asarray(query_embedding, dtype=np.float32)
+            if query.shape != (self.dim,):
+                raise ValueError(f"Query embedding has shape {query.shape}, index expects ({self.dim},)")
+            query_norm = np.linalg.norm(query)
+            if query_norm == 0:
+                return []
+
+            query = query / query_norm
+            lexical = self.lexical.scores(query_text) if query_text and self.lexical is not None else {}
+            candidates = self._lexical_candidates(lexical, top_k)
+            if candidates is None:
+                candidates = self._candidates(query)
+            cosine = scores = self._score(query, candidates)
+            if lexical and self.lexical_weight > 0:
+                scores = self._fuse(cosine, lexical, candidates)
+            k = min(top_k, scores.shape[0])
+            if k == 0:
+                return []
+            if k == scores.shape[0]:
+                top = np.argsort(-scores)
+            else:
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+            rows = top if candidates is None else candidates[top]
+            return [(self.meta[row], float(cosine[i])) for row, i in zip(rows, top)]
+
+    def _score(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine scores of a normalized query against all rows, or the given rows."""
+        count = len(self.meta) if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, FAQ_SCORE_BLOCK_ROWS):
+            end = min(start + FAQ_SCORE_BLOCK_ROWS, count)
+            block, scales = self._block(start, end) if rows is None else self._gather(rows[start:end])
+            scores[start:end] = block.astype(np.float32, copy=False) @ query
+            if self.dtype == "int8":
+                scores[start:end] *= scales
+        return scores
+
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows worth scoring for a normalized query; None means score every row (exact search)."""
+        return None
+
+    def _lexical_candidates(self, lexical: Dict[str, float], top_k: int) -> Optional[np.ndarray]:
+        """Rows of the best BM25 matches when the lexical prefilter applies, else None."""
+        if (not self.lexical_prefilter or len(self.meta) < FAQ_LEXICAL_PREFILTER_MIN_SIZE
+                or len(lexical) < top_k):
+            return None
+        shortlist = heapq.nlargest(FAQ_LEXICAL_SHORTLIST, lexical, key=lexical.__getitem__)
+        return np.array([self._rows[question_id] for question_id in shortlist], dtype=np.int64)
+
+    def _fuse(self, scores: np.ndarray, lexical: Dict[str, float], candidates: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Blends cosine scores with BM25 scores on an absolute, saturating scale:
+        (1 - w) * cosine + w * bm25 / (bm25 + FAQ_LEXICAL_SATURATION), so a weak
+        lexical match adds little however the rest of the FAQs score.
+        """
+        positions = self._rows if candidates is None else {
+            self.meta[row]["question_id"]: i for i, row in enumerate(candidates)}
+        lexical_scores = np.zeros_like(scores)
+        for question_id, score in lexical.items():
+            position = positions.get(question_id)
+            if position is not None:
+                lexical_scores[position] = score / (score + FAQ_LEXICAL_SATURATION)
+        return (1.0 - self.lexical_weight) * scores + self.lexical_weight * lexical_scores
+
+
+class IVFFAQIndex(FAQIndex):
+    """
+    Approximate FAQ index using an inverted file (IVF) over spherical k-means centroids.
+    Each row is assigned to its nearest centroid; a query only scores the rows in
+    its `nprobe` nearest lists (by default a quarter of them). Raising nprobe
+    trades latency for recall, and nprobe == nlist is equivalent to exact search;
+    measure_recall() shows where a given setting lands. Until trained, or while
+    the index holds fewer than `min_size` rows, searches fall back to exact scoring.
+    """
+
+    def __init__(self, dim: Optional[int] = None, nlist: int = FAQ_IVF_NLIST,
+                 nprobe: int = FAQ_IVF_NPROBE, min_size: int = FAQ_ANN_MIN_SIZE, dtype: str = FAQ_INDEX_DTYPE):
+        super().__init__(dim, dtype)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_size = min_size
+        self.centroids: Optional[np.ndarray] = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._defer_assign = False
+
+    def _reserve(self, size: int) -> None:
+        super()._reserve(size)
+        if self._assign.shape[0] < self.capacity:
+            assign = np.zeros(self.capacity, dtype=np.int32)
+            assign[:len(self.meta)] = self._assign[:len(self.meta)]
+            self._assign = assign
+
+    def build(self, faqs: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._assign = np.zeros(0, dtype=np.int32)
+            super().build(faqs)
+
+    def build_from_snapshot(self, snapshot: EmbeddingSnapshot, faqs: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._assign = np.zeros(len(snapshot), dtype=np.int32)
+            super().build_from_snapshot(snapshot, faqs)
+
+    def _nearest(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _rows_written(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        if self.centroids is not None and not self._defer_assign:
+            self._assign[rows] = self._nearest(vectors)
+
+    def _move_row(self, src: int, dst: int) -> None:
+        super()._move_row(src, dst)
+        self._assign[dst] = self._assign[src]
+
+    def train(self, iterations: int = 20, sample_size: Optional[int] = None, seed: int = 0) -> None:
+        """
+        Learns the coarse centroids with spherical k-means on (a sample of) the
+        current rows, then assigns every row to a list. This is the expensive step
+        the offline build in etl_scripts/build_faq_index.py runs ahead of time.
+        Args:
+            iterations: Number of Lloyd iterations
+            sample_size: Rows used for training (default: 64 per list)
+            seed: Random seed for sampling and initialisation
+        """
+        with self._lock:
+            count = len(self.meta)
+            if count == 0:
+                raise ValueError("Cannot train an empty FAQ index")
+            nlist = self.nlist or max(1, int(4 * np.sqrt(count)))
+            nlist = min(nlist, count)
+            rng = np.random.default_rng(seed)
+            sample_size = min(count, sample_size or nlist * 64)
+            sample = self.vectors(np.sort(rng.choice(count, size=sample_size, replace=False)))
+
+            centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                empty = np.bincount(labels, minlength=nlist) == 0
+                # Re-seed empty lists from random sample points so every list stays in use.
+                sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()))]
+                centroids = self.normalize(sums)
+
+            self.centroids = centroids
+            self.nlist = nlist
+            for start in range(0, count, FAQ_SCORE_BLOCK_ROWS):
+                end = min(start + FAQ_SCORE_BLOCK_ROWS, count)
+                self._assign[start:end] = self._nearest(self.vectors(np.arange(start, end)))
+            logger.info(f"Trained IVF FAQ index: {nlist} lists over {count} FAQs (sample={sample_size}).")
+
+    def probes(self) -> int:
+        """Lists scanned per query: nprobe if set, else a quarter of the lists."""
+        return min(self.nprobe or max(1, self.nlist // 4), self.nlist)
+
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        nprobe = self.probes()
+        if self.centroids is None or len(self.meta) < self.min_size or nprobe >= self.nlist:
+            return None
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        probed = np.zeros(self.nlist, dtype=bool)
+        probed[probes] = True
+        return np.flatnonzero(probed[self._assign[:len(self.meta)]])
+
+    def measure_recall(self, nprobe: Optional[int] = None, top_k: int = 10, sample_size: int = 200,
+                       queries: Optional[np.ndarray] = None, seed: int = 0) -> float:
+        """
+        recall@top_k of the IVF search against exact search: the share of the exact
+        top_k rows that the probed lists still contain, averaged over queries.
+        Args:
+            nprobe: Lists scanned per query (default: the index's setting)
+            top_k: Number of neighbours compared
+            sample_size: Number of FAQ rows used as queries when none are given
+            queries: Query embeddings, e.g. from logged user queries; sampled FAQ rows
+                are a stand-in, and tend to overstate recall slightly
+            seed: Random seed for sampling
+        Returns:
+            Mean recall in [0, 1]; 1.0 when the index is untrained
+        """
+        with self._lock:
+            count = len(self.meta)
+            if self.centroids is None or count == 0:
+                return 1.0
+            if queries is None:
+                rng = np.random.default_rng(seed)
+                queries = self.vectors(np.sort(rng.choice(count, size=min(sample_size, count), replace=False)))
+            queries = self.normalize(queries)
+            saved_nprobe, saved_min_size = self.nprobe, self.min_size
+            self.nprobe, self.min_size = nprobe or self.nprobe, 0
+            try:
+                k = min(top_k, count)
+                recall = 0.0
+                for query in queries:
+                    exact = np.argpartition(-self._score(query), k - 1)[:k]
+                    candidates = self._candidates(query)
+                    if candidates is None:
+                        recall += 1.0
+                        continue
+                    scores = self._score(query, candidates)
+                    found = candidates[np.argpartition(-scores, min(k, len(scores)) - 1)[:k]] if len(scores) else []
+                    recall += len(np.intersect1d(exact, found)) / k
+                return recall / len(queries)
+            finally:
+                self.nprobe, self.min_size = saved_nprobe, saved_min_size
+
+    # ----- Persistence -----
+    def save(self, path: str, model_name: str = NLP_MODEL_NAME) -> None:
+        """Writes centroids and list assignments so startup can skip training."""
+        with self._lock:
+            if self.centroids is None:
+                raise ValueError("IVF index has not been trained")
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    centroids=self.centroids,
+                    ids=np.array([m["question_id"] for m in self.meta], dtype=str),
+                    assign=self._assign[:len(self.meta)],
+                    model_name=np.array(model_name),
+                    built_at=np.array(datetime.utcnow().isoformat()),
+                )
+            os.replace(tmp_path, path)
+            logger.info(f"Saved IVF FAQ index ({self.nlist} lists, {len(self.meta)} FAQs) to {path}")
+
+    def build_from_saved(self, faqs: List[Dict[str, Any]], path: str, model_name: str = NLP_MODEL_NAME,
+                         snapshot: Optional[EmbeddingSnapshot] = None) -> bool:
+        """
+        Builds the index from FAQ documents (and the embedding snapshot, if given)
+        reusing centroids and list assignments from an offline build. FAQs that are
+        new or were updated after the build are assigned to their nearest centroid.
+        Returns:
+            False if the saved file is missing or was built for another model
+        """
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as saved:
+            if str(saved["model_name"]) != model_name:
+                logger.warning(f"Saved FAQ index at {path} was built for {saved['model_name']}, not {model_name}; ignoring.")
+                return False
+            centroids = saved["centroids"]
+            saved_assign = dict(zip(saved["ids"].tolist(), saved["assign"].tolist()))
+            built_at = datetime.fromisoformat(str(saved["built_at"]))
+
+        stale = {faq.get("question_id") for faq in faqs
+                 if isinstance(faq.get("updated_at"), datetime) and faq["updated_at"] > built_at}
+        with self._lock:
+            self.dim = centroids.shape[1]
+            self.centroids = centroids
+            self.nlist = centroids.shape[0]
+            self._defer_assign = True
+            try:
+                self.populate(faqs, snapshot)
+            finally:
+                self._defer_assign = False
+            missing = []
+            for row, meta in enumerate(self.meta):
+                list_id = saved_assign.get(meta["question_id"])
+                if list_id is None or meta["question_id"] in stale:
+                    missing.append(row)
+                else:
+                    self._assign[row] = list_id
+            if missing:
+                self._assign[missing] = self._nearest(self.vectors(np.array(missing)))
+        logger.info(f"Loaded IVF FAQ index from {path}: {self.nlist} lists, {len(missing)} FAQs reassigned.")
+        return True
+
+
+# Global index instance
+faq_index: Optional[FAQIndex] = None
+
+
+def create_faq_index(backend: str = FAQ_INDEX_BACKEND) -> FAQIndex:
+    """Returns an empty index for the configured backend ('exact' or 'ivf')."""
+    if backend == "exact":
+        return FAQIndex()
+    if backend == "ivf":
+        return IVFFAQIndex()
+    raise ValueError(f"Unknown FAQ index backend: {backend}")
+
+
+def load_faq_index(faqs: List[Dict[str, Any]], backend: str = FAQ_INDEX_BACKEND,
+                   snapshot: Optional[EmbeddingSnapshot] = None) -> FAQIndex:
+    """
+    Builds a fresh FAQ index and swaps it in as the process-wide instance.
+    For the IVF backend, trained centroids are loaded from FAQ_INDEX_PATH when an
+    offline build exists; otherwise the index is trained here once it is large
+    enough to benefit.
+    Args:
+        faqs: FAQ documents as returned by get_all_faqs()
+        backend: 'exact' or 'ivf'
+        snapshot: Memory-mapped embedding snapshot; FAQs without an embedding
+            field take their row from it
+    """
+    global faq_index
+    index = create_faq_index(backend)
+    if isinstance(index, IVFFAQIndex):
+        if not index.build_from_saved(faqs, FAQ_INDEX_PATH, snapshot=snapshot):
+            index.populate(faqs, snapshot)
+            if len(index) >= index.min_size:
+                logger.info("No usable offline IVF build found; training FAQ index at startup.")
+                index.train()
+    else:
+        index.populate(faqs, snapshot)
+    faq_index = index
+    return index
+
+
+def get_faq_index() -> Optional[FAQIndex]:
+    """Returns the loaded FAQ index instance."""
+    return faq_index
@@ -0,0 +1,19 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+# Model inference and index scoring are CPU-bound and release the GIL inside
+# torch/BLAS, so they run on a small dedicated pool instead of the event loop.
+# Each worker already uses several intra-op threads, so keep this close to the
+# number of batches that should encode at the same time.
+INFERENCE_POOL_SIZE = int(os.getenv("INFERENCE_POOL_SIZE", "2"))
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_POOL_SIZE, thread_name_prefix="inference")
+
+T = TypeVar("T")
+
+
+async def run_inference(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a CPU-bound call on the inference pool and awaits its result."""
+    return await asyncio.get_running_loop().run_in_executor(inference_executor, partial(fn, *args, **kwargs))
@@ -0,0 +1,131 @@
+import heapq
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+FAQ_BM25_K1 = float(os.getenv("FAQ_BM25_K1", "1.2"))  # term frequency saturation
+FAQ_BM25_B = float(os.getenv("FAQ_BM25_B", "0.75"))   # document length normalization
+
+# Word characters plus the Devanagari block (vowel signs and virama are combining
+# marks, which \w alone would split words on), minus the danda punctuation.
+_TOKEN_RE = re.compile(r"[\w\u0900-\u0963\u0966-\u097F]+")
+
+# Function words (English, Hindi and romanized Hindi) that would otherwise let
+# "what is ..." or "क्या है ..." match every FAQ phrased as a question.
+STOPWORDS = frozenset("""
+a an the is are am was were be been do does did i me my you your we our it its this that these those
+of to in on for and or at by with from about as can could should will would shall may
+what which who whom whose how when where why
+का की के है हैं था थी थे में से को और या क्या कैसे कब कहाँ कहां कौन मैं मेरा मेरी मेरे मुझे हम
+यह वह ये वो पर भी तो ही ने हो
+kya kaise hai hain ka ki ke mein me se ko aur ya mera meri mere mujhe kab kahan kaun
+""".split())
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over FAQ questions and keywords.
+    Postings map each term to the FAQs containing it and the term's frequency
+    there, so a query only touches the postings of its own terms. FAQs are
+    inserted, replaced and removed one at a time; document frequencies and the
+    average length are kept current, so no rebuild is ever needed.
+    Not thread-safe on its own: FAQIndex updates and queries it under its lock.
+    """
+
+    FIELDS = ("question", "keywords_en", "keywords_hi")
+
+    def __init__(self, k1: float = FAQ_BM25_K1, b: float = FAQ_BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}   # term -> {question_id: term frequency}
+        self._doc_terms: Dict[str, Counter] = {}        # question_id -> its term counts
+        self._doc_len: Dict[str, int] = {}              # question_id -> number of terms
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, question_id: str) -> bool:
+        return question_id in self._doc_terms
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return [token for token in _TOKEN_RE.findall(text.casefold()) if token not in STOPWORDS]
+
+    def document_terms(self, faq: Dict[str, Any]) -> Counter:
+        """Term counts of an FAQ's question and keyword lists."""
+        terms: Counter = Counter()
+        for field in self.FIELDS:
+            value = faq.get(field)
+            if not value:
+                continue
+            for text in ([value] if isinstance(value, str) else value):
+                terms.update(self.tokenize(str(text)))
+        return terms
+
+    def upsert(self, faqs: Iterable[Dict[str, Any]]) -> int:
+        """Indexes FAQs, replacing the postings of any already indexed under the same question_id."""
+        count = 0
+        for faq in faqs:
+            question_id = faq.get("question_id")
+            if question_id is None:
+                continue
+            self._drop(question_id)
+            terms = self.document_terms(faq)
+            for term, frequency in terms.items():
+                self.postings.setdefault(term, {})[question_id] = frequency
+            self._doc_terms[question_id] = terms
+            self._doc_len[question_id] = sum(terms.values())
+            self._total_len += self._doc_len[question_id]
+            count += 1
+        return count
+
+    def _drop(self, question_id: str) -> bool:
+        terms = self._doc_terms.pop(question_id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(question_id, None)
+                if not posting:
+                    del self.postings[term]
+        self._total_len -= self._doc_len.pop(question_id)
+        return True
+
+    def remove(self, question_ids: Iterable[str]) -> int:
+        return sum(self._drop(question_id) for question_id in question_ids)
+
+    def scores(self, query_text: str) -> Dict[str, float]:
+        """
+        BM25 score of every FAQ sharing at least one term with the query.
+        Returns:
+            question_id -> score (FAQs without a matching term are absent)
+        """
+        count = len(self._doc_terms)
+        if not count:
+            return {}
+        avg_len = self._total_len / count or 1.0
+        k1, b, doc_len = self.k1, self.b, self._doc_len
+        scores: Dict[str, float] = {}
+        for term in set(self.tokenize(query_text)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1.0 + (count - df + 0.5) / (df + 0.5))
+            for question_id, frequency in posting.items():
+                norm = k1 * (1 - b + b * doc_len[question_id] / avg_len)
+                weight = idf * frequency * (k1 + 1) / (frequency + norm)
+                scores[question_id] = scores.get(question_id, 0.0) + weight
+        return scores
+
+    def search(self, query_text: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """The top_k (question_id, BM25 score) pairs, best first."""
+        return heapq.nlargest(top_k, self.scores(query_text).items(), key=lambda item: item[1])
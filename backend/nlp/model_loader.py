@@ -1,31 +1,126 @@
-from sentence_transformers import SentenceTransformer
 import logging
-from typing import Optional
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:  # sentence_transformers (and torch) are imported on first load only
+    from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
+# --- Configuration ---
+NLP_MODEL_NAME = os.getenv("NLP_MODEL_NAME", "paraphrase-multilingual-MiniLM-L12-v2")
+# torch: PyTorch weights as before; onnx: ONNX Runtime on CPU; int8: PyTorch with
+# dynamically quantized int8 Linear layers on CPU.
+NLP_MODEL_BACKEND = os.getenv("NLP_MODEL_BACKEND", "torch")
+NLP_MODEL_CACHE_DIR = os.getenv("NLP_MODEL_CACHE_DIR",
+                                os.path.join(os.path.dirname(__file__), '..', 'data', 'models'))
+NLP_ONNX_FILE = os.getenv("NLP_ONNX_FILE", "")  # e.g. onnx/model_qint8_avx512_vnni.onnx; default onnx/model.onnx
+# Never touch the network when loading; defaults on for the onnx/int8 backends,
+# which are expected to be prepared in NLP_MODEL_CACHE_DIR ahead of time.
+_offline = os.getenv("NLP_MODEL_OFFLINE")
+NLP_MODEL_OFFLINE = _offline.lower() == "true" if _offline is not None else NLP_MODEL_BACKEND != "torch"
+
+MODEL_BACKENDS = ("torch", "onnx", "int8")
+
 # Global model instance
-model: Optional[SentenceTransformer] = None
+model: Optional["SentenceTransformer"] = None
+loaded_model_name: Optional[str] = None
+_load_lock = threading.Lock()
+
+
+def local_model_path(model_name: str, cache_dir: str = NLP_MODEL_CACHE_DIR) -> str:
+    """Directory a model is saved to inside the local cache (see etl_scripts/benchmark_model_backends.py)."""
+    return os.path.join(cache_dir, model_name.replace("/", "__"))
+
+
+def require_onnx_runtime() -> None:
+    """
+    Raises:
+        RuntimeError: If the optional ONNX dependencies (requirements-onnx.txt) are not installed
+    """
+    try:
+        import onnxruntime  # noqa: F401
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(f"The onnx model backend needs ONNX Runtime and Optimum ({e}); "
+                           f"install them with `pip install -r requirements-onnx.txt`.") from e
+
 
-def load_nlp_model(model_name: str) -> None:
+def create_model(model_name: str, backend: str = NLP_MODEL_BACKEND, cache_dir: str = NLP_MODEL_CACHE_DIR,
+                 offline: bool = NLP_MODEL_OFFLINE) -> "SentenceTransformer":
+    """
+    Builds a SentenceTransformer for the given inference backend without touching
+    the process-wide instance.
+    Args:
+        model_name: Model name; a copy saved under cache_dir is preferred
+        backend: 'torch', 'onnx' or 'int8'
+        cache_dir: Local model cache directory
+        offline: Load from local files only (no Hugging Face Hub access)
+    """
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown NLP model backend {backend!r}; expected one of {MODEL_BACKENDS}")
+    if backend == "onnx":
+        require_onnx_runtime()
+    if offline:
+        # Must be set before huggingface_hub is first imported.
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    from sentence_transformers import SentenceTransformer
+
+    local_path = local_model_path(model_name, cache_dir)
+    source = local_path if os.path.isdir(local_path) else model_name
+    kwargs = {"cache_folder": cache_dir}
+    if offline:
+        kwargs["local_files_only"] = True
+    if backend != "torch":
+        kwargs["device"] = "cpu"
+    if backend == "onnx":
+        kwargs["backend"] = "onnx"
+        if NLP_ONNX_FILE:
+            kwargs["model_kwargs"] = {"file_name": NLP_ONNX_FILE}
+    loaded = SentenceTransformer(source, **kwargs)
+    if backend == "int8":
+        import torch
+        torch.quantization.quantize_dynamic(loaded, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return loaded
+
+
+def load_nlp_model(model_name: str = NLP_MODEL_NAME) -> None:
     """
     Loads the sentence transformer model for generating embeddings.
+    The model is loaded at most once per process; later calls (and get_model())
+    reuse it. Concurrent first calls wait for the one load in progress.
     Args:
         model_name: Name of the model to load (e.g., 'paraphrase-multilingual-MiniLM-L12-v2')
     """
-    global model
-    try:
-        logger.info(f"Loading NLP model: {model_name}")
-        model = SentenceTransformer(model_name)
-        logger.info("NLP model loaded successfully")
-    except Exception as e:
-        logger.error(f"Error loading NLP model: {e}", exc_info=True)
-        raise
+    global model, loaded_model_name
+    if model is not None:
+        if model_name != loaded_model_name:
+            logger.warning(f"NLP model {loaded_model_name} is already loaded; ignoring request for {model_name}.")
+        return
+    with _load_lock:
+        if model is not None:
+            return
+        try:
+            logger.info(f"Loading NLP model: {model_name} (backend={NLP_MODEL_BACKEND}, offline={NLP_MODEL_OFFLINE})")
+            model = create_model(model_name)
+            loaded_model_name = model_name
+            logger.info("NLP model loaded successfully")
+        except Exception as e:
+            logger.error(f"Error loading NLP model: {e}", exc_info=True)
+            raise
 
-def get_model() -> Optional[SentenceTransformer]:
-    """Returns the loaded model instance."""
+def get_model() -> Optional["SentenceTransformer"]:
+    """Returns the model instance, loading the configured model on first use."""
+    if model is None:
+        load_nlp_model(NLP_MODEL_NAME)
     return model
 
+def get_model_name() -> Optional[str]:
+    """Returns the name of the loaded model (the configured one until it is loaded)."""
+    return loaded_model_name or NLP_MODEL_NAME
+
 def generate_embedding(text: str) -> list:
     """
     Generates embedding for the given text using the loaded model.
@@ -34,14 +129,12 @@ def generate_embedding(text: str) -> list:
     Returns:
         List of floats representing the text embedding
     """
-    if not model:
+    current = get_model()
+    if not current:
         raise RuntimeError("NLP model not loaded")
     try:
-        embedding = model.encode(text, convert_to_tensor=False)
+        embedding = current.encode(text, convert_to_tensor=False)
         return embedding.tolist()
     except Exception as e:
         logger.error(f"Error generating embedding: {e}", exc_info=True)
         raise
-
-# Load model on import or call explicitly once on app startup
-load_nlp_model("paraphrase-multilingual-MiniLM-L12-v2")
@@ -0,0 +1,111 @@
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from bson.binary import Binary
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# How FAQ embeddings are stored on documents and held in the in-process scoring matrix.
+#   float32: 4 bytes/dim (documents keep the plain 'embedding' float list)
+#   float16: 2 bytes/dim
+#   int8:    1 byte/dim plus one float32 scale per vector
+EMBEDDING_STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")
+FAQ_INDEX_DTYPE = os.getenv("FAQ_INDEX_DTYPE", "float32")
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+# Fields a quantized embedding occupies on an FAQ document.
+QUANTIZED_FIELDS = ("embedding_q", "embedding_dtype", "embedding_scale")
+
+
+def check_dtype(dtype: str) -> str:
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype {dtype!r}; expected one of {SUPPORTED_DTYPES}")
+    return dtype
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converts float vectors (one per row) to the storage dtype.
+    Returns:
+        (values, scales): values in dtype and one float32 scale per row, so that
+        values * scales approximates the input. Scales are 1 except for int8,
+        where each row is scaled symmetrically by max(|x|) / 127.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.ones(vectors.shape[:-1], dtype=np.float32)
+    if check_dtype(dtype) == "float32":
+        return vectors, scales
+    if dtype == "float16":
+        return vectors.astype(np.float16), scales
+    peaks = np.abs(vectors).max(axis=-1)
+    scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+    values = np.clip(np.rint(vectors / scales[..., None]), -127, 127).astype(np.int8)
+    return values, scales
+
+
+def dequantize(values: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """Inverse of quantize(): float32 vectors from stored values and per-row scales."""
+    vectors = np.asarray(values).astype(np.float32)
+    if scales is not None and values.dtype == np.int8:
+        vectors *= np.asarray(scales, dtype=np.float32)[..., None]
+    return vectors
+
+
+def encode_embedding(embedding, dtype: str = EMBEDDING_STORAGE_DTYPE) -> Dict[str, Any]:
+    """
+    Document fields holding an embedding in the given storage dtype.
+    float32 keeps the plain 'embedding' list; float16/int8 store the raw bytes
+    in 'embedding_q' with 'embedding_dtype' (and 'embedding_scale' for int8).
+    """
+    if check_dtype(dtype) == "float32":
+        return {"embedding": np.asarray(embedding, dtype=np.float32).tolist()}
+    values, scales = quantize(np.asarray(embedding, dtype=np.float32)[None, :], dtype)
+    fields = {"embedding_q": Binary(values[0].tobytes()), "embedding_dtype": dtype}
+    if dtype == "int8":
+        fields["embedding_scale"] = float(scales[0])
+    return fields
+
+
+def decode_embedding(doc: Dict[str, Any]) -> Optional[np.ndarray]:
+    """
+    The float32 embedding of an FAQ document in either storage format.
+    Returns:
+        None if the document carries no embedding
+    """
+    embedding = doc.get("embedding")
+    if embedding is not None and len(embedding):
+        return np.asarray(embedding, dtype=np.float32)
+    raw = doc.get("embedding_q")
+    if not raw:
+        return None
+    dtype = doc.get("embedding_dtype", "float16")
+    values = np.frombuffer(bytes(raw), dtype=np.dtype(check_dtype(dtype)))
+    if dtype == "int8":
+        return values.astype(np.float32) * np.float32(doc.get("embedding_scale", 1.0))
+    return values.astype(np.float32)
+
+
+def has_embedding(doc: Dict[str, Any]) -> bool:
+    return doc.get("embedding") is not None or bool(doc.get("embedding_q"))
+
+
+def embedding_update(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Update document for upserting an FAQ: $set its fields and, when it carries
+    an embedding, $unset the fields of the other storage format so a document
+    never holds two embeddings.
+    """
+    update: Dict[str, Any] = {"$set": doc}
+    if "embedding" in doc:
+        stale = QUANTIZED_FIELDS
+    elif "embedding_q" in doc:
+        stale = ("embedding",) + (() if "embedding_scale" in doc else ("embedding_scale",))
+    else:
+        stale = ()
+    if stale:
+        update["$unset"] = {field: "" for field in stale}
+    return update
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.nlp.inference_pool import inference_executor
+
+if TYPE_CHECKING:  # sentence_transformers (and torch) are imported on first load only
+    from sentence_transformers import CrossEncoder
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL_NAME", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+RERANK_SHORTLIST = int(os.getenv("RERANK_SHORTLIST", "20"))            # bi-encoder candidates re-scored
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))         # per-query latency budget
+RERANK_MAX_INFLIGHT = int(os.getenv("RERANK_MAX_INFLIGHT", "4"))       # concurrent re-rankings before skipping
+RERANK_PROBE_INTERVAL = float(os.getenv("RERANK_PROBE_INTERVAL", "5"))  # seconds between retries once over budget
+# Re-ranker scores are probabilities (sigmoid), so they get their own answer threshold.
+RERANK_THRESHOLD = float(os.getenv("RERANK_THRESHOLD", "0.5"))
+
+Match = Tuple[Dict[str, Any], float]
+
+
+class Reranker:
+    """
+    Optional second retrieval stage: a CPU cross-encoder re-scores the
+    bi-encoder's shortlist of (query, FAQ question) pairs.
+    Re-ranking is skipped, and the bi-encoder order kept, whenever it would
+    exceed the latency budget: when RERANK_MAX_INFLIGHT re-rankings are already
+    running, when the recent average latency (EWMA) is over budget, or when a
+    call does not finish within the budget. While over budget, one query every
+    RERANK_PROBE_INTERVAL seconds is still re-ranked to refresh the estimate.
+    """
+
+    def __init__(self, enabled: bool = RERANK_ENABLED, model_name: str = RERANK_MODEL_NAME,
+                 shortlist: int = RERANK_SHORTLIST, budget_ms: float = RERANK_BUDGET_MS,
+                 max_inflight: int = RERANK_MAX_INFLIGHT, probe_interval: float = RERANK_PROBE_INTERVAL):
+        self.enabled = enabled
+        self.model_name = model_name
+        self.shortlist = max(1, shortlist)
+        self.budget = budget_ms / 1000.0
+        self.max_inflight = max(1, max_inflight)
+        self.probe_interval = probe_interval
+        self.model: Optional["CrossEncoder"] = None
+        self._load_lock = threading.Lock()
+        self._inflight = 0
+        self._latency: Optional[float] = None   # EWMA of completed re-rankings, seconds
+        self._last_probe = 0.0
+        # Metrics
+        self.counts: Counter = Counter()
+
+    def load(self) -> None:
+        """Loads the cross-encoder once per process."""
+        if self.model is not None:
+            return
+        with self._load_lock:
+            if self.model is not None:
+                return
+            from sentence_transformers import CrossEncoder
+            logger.info(f"Loading re-ranker model: {self.model_name}")
+            self.model = CrossEncoder(self.model_name, device="cpu")
+            logger.info("Re-ranker model loaded successfully")
+
+    def _predict(self, query_text: str, questions: List[str]) -> np.ndarray:
+        self.load()
+        started = time.perf_counter()
+        scores = np.asarray(self.model.predict([(query_text, question) for question in questions],
+                                               batch_size=len(questions), show_progress_bar=False), dtype=np.float32)
+        elapsed = time.perf_counter() - started
+        self._latency = elapsed if self._latency is None else 0.8 * self._latency + 0.2 * elapsed
+        return scores
+
+    def _skip_reason(self) -> Optional[str]:
+        if self._inflight >= self.max_inflight:
+            return "skipped_load"
+        if self._latency is not None and self._latency > self.budget:
+            now = time.monotonic()
+            if now - self._last_probe < self.probe_interval:
+                return "skipped_budget"
+            self._last_probe = now
+        return None
+
+    def _finished(self, future: asyncio.Future) -> None:
+        self._inflight -= 1
+        if not future.cancelled():
+            future.exception()  # a call that outlived its budget may fail unobserved
+
+    async def rerank(self, query_text: str, matches: List[Match], top_k: int) -> Tuple[List[Match], bool]:
+        """
+        Re-orders the bi-encoder matches by cross-encoder score.
+        Args:
+            query_text: The user's query (not synonym-expanded)
+            matches: Bi-encoder shortlist, best first
+            top_k: Number of matches to return
+        Returns:
+            (matches, reranked): the top_k matches, scored by the cross-encoder
+            when reranked is True, otherwise the bi-encoder matches unchanged
+        """
+        if not self.enabled or len(matches) < 2:
+            return matches[:top_k], False
+        reason = self._skip_reason()
+        if reason is not None:
+            self.counts[reason] += 1
+            return matches[:top_k], False
+
+        questions = [faq.get("question") or "" for faq, _ in matches]
+        self._inflight += 1
+        future = asyncio.get_running_loop().run_in_executor(inference_executor, self._predict, query_text, questions)
+        future.add_done_callback(self._finished)  # the slot is held until the model call really ends
+        try:
+            scores = await asyncio.wait_for(asyncio.shield(future), self.budget)
+        except asyncio.TimeoutError:
+            self.counts["timed_out"] += 1
+            return matches[:top_k], False
+        except Exception as e:
+            logger.error(f"Re-ranking failed, keeping bi-encoder order: {e}", exc_info=True)
+            self.counts["failed"] += 1
+            return matches[:top_k], False
+        self.counts["reranked"] += 1
+        order = np.argsort(-scores)[:top_k]
+        return [(matches[i][0], float(scores[i])) for i in order], True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "model": self.model_name,
+            "shortlist": self.shortlist,
+            "budget_ms": 1000 * self.budget,
+            "avg_latency_ms": 1000 * self._latency if self._latency is not None else None,
+            "inflight": self._inflight,
+            **{key: self.counts[key] for key in ("reranked", "skipped_load", "skipped_budget", "timed_out", "failed")},
+        }
+
+
+# Global re-ranker instance
+reranker = Reranker()
@@ -1,21 +1,80 @@
 from typing import List
 from numpy import dot
 from numpy.linalg import norm
+import numpy as np
 import logging
+import os
+import unicodedata
+
+from backend.nlp.cache import LRUCache
+from backend.nlp.batcher import embedding_batcher
+from backend.services.metrics import EMBEDDING_CACHE_LOOKUPS
 
 logger = logging.getLogger(__name__)
 
 # Function to get the NLP model (will be loaded via model_loader.py)
-from backend.nlp.model_loader import get_model
+from backend.nlp.model_loader import get_model, get_model_name
+
+# --- Query embedding cache ---
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))            # entries; 0 disables
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))             # seconds; 0 = no expiry
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+embedding_cache = LRUCache(
+    max_entries=EMBEDDING_CACHE_SIZE,
+    ttl=EMBEDDING_CACHE_TTL or None,
+    max_bytes=EMBEDDING_CACHE_MAX_BYTES,
+    sizeof=lambda vector: vector.nbytes,
+)
+
+def normalize_query_text(text: str) -> str:
+    """Cache key form of a query: Unicode NFC, case-folded, whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
 
 def get_embedding(text: str) -> List[float]:
+    """
+    Embeds text with the loaded model. Repeated queries (same normalized text and
+    model) are served from an LRU + TTL cache and skip the transformer entirely.
+    """
     try:
         model = get_model()
         # Ensure the model is loaded before encoding
         if model is None:
             raise RuntimeError("NLP model is not loaded. Cannot generate embeddings.")
-        embedding = model.encode(text, convert_to_tensor=False).tolist()
-        return embedding
+        cache_key = (get_model_name(), normalize_query_text(text))
+        cached = embedding_cache.get(cache_key)
+        EMBEDDING_CACHE_LOOKUPS.labels(result="hit" if cached is not None else "miss").inc()
+        if cached is not None:
+            return cached.tolist()
+        embedding = np.asarray(model.encode(text, convert_to_tensor=False), dtype=np.float32)
+        embedding.flags.writeable = False
+        embedding_cache.put(cache_key, embedding)
+        return embedding.tolist()
+    except RuntimeError as e:
+        logger.error(f"NLP model error during embedding generation: {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Error generating embedding for text '{text}': {e}", exc_info=True)
+        raise
+
+async def get_embedding_async(text: str) -> List[float]:
+    """
+    Async variant of get_embedding for request handlers. Cache misses go through
+    the micro-batching scheduler, so concurrent requests share one batched
+    encode that runs off the event loop.
+    """
+    try:
+        cache_key = (get_model_name(), normalize_query_text(text))
+        cached = embedding_cache.get(cache_key)
+        EMBEDDING_CACHE_LOOKUPS.labels(result="hit" if cached is not None else "miss").inc()
+        if cached is not None:
+            return cached.tolist()
+        # The batcher loads the model on first use, on an inference thread.
+        # Copy the row so the cache does not pin the whole batch matrix.
+        embedding = np.array(await embedding_batcher.embed(text), dtype=np.float32)
+        embedding.flags.writeable = False
+        embedding_cache.put(cache_key, embedding)
+        return embedding.tolist()
     except RuntimeError as e:
         logger.error(f"NLP model error during embedding generation: {e}")
         raise
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.db.mongo_utils import get_chatbot_db, get_keywords_version, run_db
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+KEYWORDS_COLLECTION = os.getenv("KEYWORDS_COLLECTION", "keywords")
+SYNONYM_REFRESH_INTERVAL = float(os.getenv("SYNONYM_REFRESH_INTERVAL", "5"))  # seconds; 0 disables reloads
+
+_TERMINAL = "\0"  # trie key holding the entries a phrase ends in
+
+
+class SynonymIndex:
+    """
+    In-memory synonym expansion index built from the `keywords` collection.
+    Each language has a token trie keyed on its synonym phrases, so single words
+    and multi-word phrases ("minimum wage") are matched in one left-to-right
+    pass over the query. A match expands to the entry's English and Hindi
+    keywords plus all of its synonyms.
+    """
+
+    # Which synonym list is matched against a query, per query language.
+    SEARCH_FIELDS = {"en": "english_synonyms"}
+    DEFAULT_SEARCH_FIELD = "hindi_synonyms"
+
+    def __init__(self):
+        self.version: Any = None
+        self.expansions: List[List[str]] = []
+        self._tries: Dict[str, Dict[str, Any]] = {}
+        self._max_phrase_len = 1
+
+    def __len__(self) -> int:
+        return len(self.expansions)
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return [word.strip().lower() for word in text.split() if word.strip()]
+
+    def build(self, docs: Iterable[Dict[str, Any]], version: Any = None) -> None:
+        expansions: List[List[str]] = []
+        tries: Dict[str, Dict[str, Any]] = {}
+        max_phrase_len = 1
+        for doc in docs:
+            entry = len(expansions)
+            terms = [doc.get('english_keyword', ''), doc.get('hindi_keyword', '')]
+            terms += doc.get('english_synonyms', []) + doc.get('hindi_synonyms', [])
+            expansions.append([term for term in dict.fromkeys(terms) if term])
+            for field in set(self.SEARCH_FIELDS.values()) | {self.DEFAULT_SEARCH_FIELD}:
+                trie = tries.setdefault(field, {})
+                for phrase in doc.get(field, []):
+                    tokens = self.tokenize(phrase)
+                    if not tokens:
+                        continue
+                    max_phrase_len = max(max_phrase_len, len(tokens))
+                    node = trie
+                    for token in tokens:
+                        node = node.setdefault(token, {})
+                    node.setdefault(_TERMINAL, []).append(entry)
+        self.expansions = expansions
+        self._tries = tries
+        self._max_phrase_len = max_phrase_len
+        self.version = version
+        logger.info(f"Built synonym index with {len(expansions)} entries (longest phrase: {max_phrase_len} words).")
+
+    def expand(self, query_text: str, language: str) -> List[str]:
+        """
+        Returns the expansion keywords for every synonym phrase found in the query.
+        Args:
+            query_text: The user's query
+            language: Query language; 'en' matches English synonyms, others Hindi
+        """
+        trie = self._tries.get(self.SEARCH_FIELDS.get(language, self.DEFAULT_SEARCH_FIELD))
+        if not trie:
+            return []
+        tokens = self.tokenize(query_text)
+        matched: Dict[int, None] = {}
+        for start in range(len(tokens)):
+            node = trie
+            for token in tokens[start:start + self._max_phrase_len]:
+                node = node.get(token)
+                if node is None:
+                    break
+                for entry in node.get(_TERMINAL, ()):
+                    matched[entry] = None
+        expanded: Dict[str, None] = {}
+        for entry in matched:
+            for term in self.expansions[entry]:
+                expanded[term] = None
+        return list(expanded)
+
+
+# Global index instance
+synonym_index: Optional[SynonymIndex] = None
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def load_synonym_index() -> SynonymIndex:
+    """Loads the keywords collection into a fresh synonym index and swaps it in."""
+    global synonym_index
+    version = get_keywords_version(KEYWORDS_COLLECTION)
+    index = SynonymIndex()
+    index.build(get_chatbot_db()[KEYWORDS_COLLECTION].find({}, {"_id": 0}), version=version)
+    synonym_index = index
+    return index
+
+
+def get_synonym_index() -> Optional[SynonymIndex]:
+    """Returns the loaded synonym index instance."""
+    return synonym_index
+
+
+async def _refresh_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            version = await run_db(get_keywords_version, KEYWORDS_COLLECTION)
+            if synonym_index is None or version != synonym_index.version:
+                logger.info("Synonym set changed; reloading synonym index.")
+                await run_db(load_synonym_index)
+        except Exception as e:
+            logger.warning(f"Synonym index refresh failed: {e}")
+
+
+def start_synonym_refresh(interval: float = SYNONYM_REFRESH_INTERVAL) -> None:
+    """Reloads the synonym index in the background whenever the keyword fingerprint changes."""
+    global _refresh_task
+    if interval > 0 and (_refresh_task is None or _refresh_task.done()):
+        _refresh_task = asyncio.get_running_loop().create_task(_refresh_loop(interval))
+
+
+async def stop_synonym_refresh() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+        _refresh_task = None
@@ -1,46 +1,128 @@
+from collections import Counter
+import math
+import re
+
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import pandas as pd
-import difflib
+from openpyxl import load_workbook
+import numpy as np
+from scipy.sparse import csc_matrix
 
 app = Flask(__name__)
 CORS(app)  # Allow requests from any origin (React frontend)
 
-# Load dataset
-df = pd.read_excel("data/labour_data.xlsx")
+def load_dataset(path, columns=("Question", "Answer")):
+    """
+    Streams the workbook row by row (openpyxl read-only mode) and keeps only the
+    given columns, so large exports are never materialised as a full DataFrame.
+    Rows with an empty question are skipped.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+        positions = [header.index(column) for column in columns]
+        values = tuple([] for _ in columns)
+        for row in rows:
+            cells = [row[i] if i < len(row) else None for i in positions]
+            if cells[0] is None or not str(cells[0]).strip():
+                continue
+            for column_values, cell in zip(values, cells):
+                column_values.append("" if cell is None else str(cell))
+        return values
+    finally:
+        workbook.close()
+
+class CharNgramMatcher:
+    """
+    TF-IDF over character n-grams (trigrams by default), built once at startup.
+    Each question is a row of a sparse, L2-normalized matrix stored by column,
+    so matching a query only reads the columns of its own n-grams and scores
+    every question in one sparse matrix-vector product. Scores are cosine
+    similarities in [0, 1] and tolerate typos and word-order changes.
+    """
+
+    def __init__(self, texts, n=3):
+        self.n = n
+        self.vocabulary = {}
+        rows, columns, counts = [], [], []
+        for row, text in enumerate(texts):
+            for gram, count in Counter(self.ngrams(text)).items():
+                rows.append(row)
+                columns.append(self.vocabulary.setdefault(gram, len(self.vocabulary)))
+                counts.append(count)
+        rows = np.array(rows, dtype=np.int64)
+        columns = np.array(columns, dtype=np.int64)
+        document_frequency = np.bincount(columns, minlength=len(self.vocabulary))
+        # Smoothed idf and sublinear tf, as in scikit-learn's TfidfVectorizer(sublinear_tf=True)
+        self.idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+        weights = (1 + np.log(np.array(counts, dtype=np.float64))) * self.idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(texts)))
+        weights /= norms[rows]
+        self.matrix = csc_matrix((weights, (rows, columns)), shape=(len(texts), len(self.vocabulary)))
+
+    def ngrams(self, text):
+        text = " " + re.sub(r"\s+", " ", str(text).casefold()).strip() + " "
+        return [text[i:i + self.n] for i in range(len(text) - self.n + 1)]
 
-def search_dataset(query):
-    questions = df['Question'].astype(str).tolist()
-    answers = df['Answer'].astype(str).tolist()
+    def search(self, query, top_k=1):
+        """Returns up to top_k (row, similarity) pairs, best first; rows sharing no n-gram are left out."""
+        counts = Counter(self.ngrams(query))
+        known = [gram for gram in counts if gram in self.vocabulary]
+        if not known:
+            return []
+        # n-grams no question contains still count towards the query's norm (with the maximal idf)
+        unseen_idf = math.log(1 + self.matrix.shape[0]) + 1
+        norm = math.sqrt(sum(((1 + math.log(count)) * (self.idf[self.vocabulary[gram]] if gram in self.vocabulary
+                                                        else unseen_idf)) ** 2 for gram, count in counts.items()))
+        columns = np.array([self.vocabulary[gram] for gram in known])
+        weights = np.array([1 + math.log(counts[gram]) for gram in known]) * self.idf[columns] / norm
+        scores = self.matrix[:, columns] @ weights
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), min(float(scores[row]), 1.0)) for row in top if scores[row] > 0]
 
-    matches = difflib.get_close_matches(query, questions, n=1, cutoff=0.0)  # no cutoff, get best match always
-    if matches:
-        best_match = matches[0]
-        idx = questions.index(best_match)
-        answer = answers[idx]
-        similarity = difflib.SequenceMatcher(None, query, best_match).ratio()
-        return answer, similarity
-    else:
-        return None, 0.0
+# Load dataset and build the matcher once
+questions, answers = load_dataset("data/labour_data.xlsx")
+matcher = CharNgramMatcher(questions)
+
+def search_dataset(query, top_k=1):
+    """
+    Returns the top_k (question, answer, similarity) matches for the query, best first.
+    Similarity is the cosine of the character-trigram TF-IDF vectors.
+    """
+    return [(questions[row], answers[row], similarity) for row, similarity in matcher.search(query, top_k)]
 
 @app.route("/chat_api/chat", methods=["POST"])
 def get_answer():
     data = request.get_json()
     query = data.get("query_text", "")
-    answer, similarity = search_dataset(query)
+    try:
+        top_k = max(1, min(int(data.get("top_k", 1)), 20))
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_k must be an integer"}), 400
+    matches = search_dataset(query, top_k)
 
-    if answer is None:
+    if not matches:
         # No match found at all - fallback
         return jsonify({
             "bot_response": "ASK_ADMIN",
-            "similarity_score": similarity
-        })
-    else:
-        # Return best matched answer with similarity score
-        return jsonify({
-            "bot_response": answer,
-            "similarity_score": similarity
+            "similarity_score": 0.0
         })
 
+    # Return best matched answer with similarity score
+    _, answer, similarity = matches[0]
+    response = {
+        "bot_response": answer,
+        "similarity_score": similarity
+    }
+    if top_k > 1:
+        response["matches"] = [
+            {"question": question, "answer": answer, "similarity_score": similarity}
+            for question, answer, similarity in matches
+        ]
+    return jsonify(response)
+
 if __name__ == "__main__":
     app.run(port=5001, debug=True)
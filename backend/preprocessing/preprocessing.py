@@ -1,7 +1,10 @@
+import logging
 import time
 import re
 from typing import List, Optional
 
+logger = logging.getLogger(__name__)
+
 # Initialize flags for optional dependencies
 SPACY_AVAILABLE = False
 TEXTBLOB_AVAILABLE = False
@@ -76,30 +79,28 @@ class TranscriptProcessor:
 
     @staticmethod
     def preprocess_transcript(transcript: str) -> str:
-        """Applies NLP techniques to clean up the transcript and logs time taken."""
-        start_time = time.time()
-        
-        print("\n🔹 Original Transcript:\n", transcript)
-        
+        """Applies NLP techniques to clean up the transcript and logs time taken per step."""
+        start_time = time.perf_counter()
+        logger.debug(f"Original transcript: {transcript}")
+
         # Step 1: Remove filler words
-        t1 = time.time()
+        t1 = time.perf_counter()
         transcript = TranscriptProcessor.remove_filler_words(transcript)
-        print("\n Filler words removed in", round(time.time() - t1, 4), "seconds")
+        filler_time = time.perf_counter() - t1
 
         # Step 2: Grammar correction
-        t2 = time.time()
+        t2 = time.perf_counter()
         transcript = TranscriptProcessor.correct_grammar(transcript)
-        print(" Grammar corrected in", round(time.time() - t2, 4), "seconds")
+        grammar_time = time.perf_counter() - t2
 
         # Step 3: Sentence segmentation
-        t3 = time.time()
+        t3 = time.perf_counter()
         transcript = TranscriptProcessor.segment_sentences(transcript)
-        print(" Sentence segmentation done in", round(time.time() - t3, 4), "seconds")
+        segmentation_time = time.perf_counter() - t3
 
-        total_time = round(time.time() - start_time, 4)
-        print("\n⏳ Total Preprocessing Time:", total_time, "seconds")
-        print("\n🔹 Cleaned Transcript:\n", transcript)
-        
+        logger.debug(f"Transcript preprocessed in {time.perf_counter() - start_time:.4f}s "
+                     f"(filler words {filler_time:.4f}s, grammar {grammar_time:.4f}s, "
+                     f"segmentation {segmentation_time:.4f}s): {transcript}")
         return transcript
 
 # Initialize dependencies when module is loaded
@@ -107,5 +108,6 @@ TranscriptProcessor.initialize_dependencies()
 
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
     raw_transcript = "Um so I was like you know actually uh going to the uh market and uh it was really cool so yeah."
     preprocessed_transcript = TranscriptProcessor.preprocess_transcript(raw_transcript)
\ No newline at end of file
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Body
+from fastapi import APIRouter, HTTPException, Depends, status, Body, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from bson import ObjectId 
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 import os
-from backend.db.mongo_utils import get_mongo_db, get_unanswered_logs, get_all_logs_entries, get_admin_user, create_admin_user
+from backend.db.mongo_utils import get_mongo_db, get_admin_db, get_admin_user, create_admin_user, upsert_faq, run_db, decode_log_cursor, find_logs, iter_logs, log_filter, LOG_FIELDS
 from backend.models.chat_model import AdminLogin
+from backend.nlp.similarity import get_embedding, embedding_cache
+from backend.nlp.batcher import embedding_batcher
+from backend.nlp.inference_pool import run_inference
+from backend.nlp.reranker import reranker
+from backend.services.response_cache import response_cache
+from backend.services.log_export import export_logs, EXPORT_BATCH_SIZE, EXPORT_FORMATS
+from backend.db.log_writer import log_writer
+from backend.db.indexes import index_usage_report
+from backend.nlp.faq_index import get_faq_index, faq_embedding_text
+from backend.nlp.quantization import encode_embedding
 from passlib.context import CryptContext  # For password hashing
 import jwt  # PyJWT for token handling
 
@@ -18,6 +29,10 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-super-secret-key-please-change-th
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# --- Log Pagination ---
+LOG_PAGE_SIZE = int(os.getenv("LOG_PAGE_SIZE", "100"))
+LOG_PAGE_SIZE_MAX = int(os.getenv("LOG_PAGE_SIZE_MAX", "1000"))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/admin_api/token")
 
@@ -57,26 +72,92 @@ async def get_current_admin_user(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
 
 
+class LogPageParams:
+    """Query parameters shared by the paginated log endpoints."""
+
+    def __init__(
+        self,
+        limit: int = Query(LOG_PAGE_SIZE, ge=1, le=LOG_PAGE_SIZE_MAX, description="Entries per page."),
+        after: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page."),
+        fields: Optional[str] = Query(None, description="Comma-separated log fields to return."),
+        status: Optional[str] = Query(None, description="Filter by status (answered, unanswered, error)."),
+        language: Optional[str] = Query(None, description="Filter by language."),
+        user_id: Optional[str] = Query(None, description="Filter by user ID."),
+        start: Optional[datetime] = Query(None, description="Only entries at or after this time."),
+        end: Optional[datetime] = Query(None, description="Only entries before this time."),
+    ):
+        self.limit = limit
+        self.after = after
+        self.fields = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        unknown = set(self.fields or ()) - set(LOG_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown log fields: {', '.join(sorted(unknown))}")
+        self.filters = {"status": status, "language": language, "user_id": user_id, "start": start, "end": end}
+
+
+async def fetch_log_page(response: Response, params: LogPageParams, unanswered: bool = False) -> List[Dict[str, Any]]:
+    """
+    Runs one paginated log query and sets the X-Next-Cursor header when more
+    entries follow (pass it back as ?after= to get the next page).
+    """
+    if params.after:
+        try:
+            decode_log_cursor(params.after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    logs, next_cursor = await run_db(find_logs, log_filter(unanswered, **params.filters),
+                                     params.limit, params.after, params.fields)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return logs
+
+
 @router.get("/unanswered_logs", response_model=List[Dict[str, Any]])
-async def get_unanswered_logs_api(current_user: dict = Depends(get_current_admin_user)):
+async def get_unanswered_logs_api(response: Response, params: LogPageParams = Depends(),
+                                  current_user: dict = Depends(get_current_admin_user)):
     try:
-        logs = get_unanswered_logs()
-        return logs
+        return await fetch_log_page(response, params, unanswered=True)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching unanswered logs: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to fetch unanswered logs")
 
 
 @router.get("/all_logs", response_model=List[Dict[str, Any]])
-async def get_all_logs_api(current_user: dict = Depends(get_current_admin_user)):
+async def get_all_logs_api(response: Response, params: LogPageParams = Depends(),
+                           current_user: dict = Depends(get_current_admin_user)):
     try:
-        logs = get_all_logs_entries()
-        return logs
+        return await fetch_log_page(response, params)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching all logs: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to fetch all logs")
 
 
+@router.get("/nlp_stats")
+async def get_nlp_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Embedding batcher, re-ranker, cache and log writer counters."""
+    return {
+        "embedding_batcher": embedding_batcher.stats(),
+        "reranker": reranker.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "log_writer": log_writer.stats(),
+    }
+
+
+@router.get("/index_report")
+async def get_index_report(current_user: dict = Depends(get_current_admin_user)):
+    """Index access counts and the query plans of the hot queries (see backend/db/indexes.py)."""
+    try:
+        return await run_db(index_usage_report, get_mongo_db(), get_admin_db())
+    except Exception as e:
+        logger.error(f"Error building index report: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to build index report")
+
+
 @router.post("/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     user = await get_admin_user(form_data.username)
@@ -110,36 +191,99 @@ async def register_admin_user(user_data: AdminLogin):
 
 
 @router.get("/unanswered_queries", response_model=List[Dict[str, Any]])
-async def get_admin_unanswered_queries(current_user: Dict[str, Any] = Depends(get_current_admin_user)):
+async def get_admin_unanswered_queries(response: Response, params: LogPageParams = Depends(),
+                                       current_user: Dict[str, Any] = Depends(get_current_admin_user)):
     if current_user["role"] not in ["admin", "viewer"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this resource.")
     try:
-        queries = get_unanswered_logs()
-        return queries
+        return await fetch_log_page(response, params, unanswered=True)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to retrieve unanswered queries for admin: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to retrieve data.")
 
 
 @router.get("/logs", response_model=List[Dict[str, Any]])
-async def get_admin_all_logs(current_user: Dict[str, Any] = Depends(get_current_admin_user)):
+async def get_admin_all_logs(response: Response, params: LogPageParams = Depends(),
+                             current_user: Dict[str, Any] = Depends(get_current_admin_user)):
     if current_user["role"] not in ["admin", "viewer"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this resource.")
     try:
-        logs = get_all_logs_entries()
-        return logs
+        return await fetch_log_page(response, params)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to retrieve all logs for admin: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to retrieve data.")
 
 
+@router.get("/export_logs")
+async def export_all_logs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv."),
+    status_filter: Optional[str] = Query(None, alias="status", description="Filter by status."),
+    start: Optional[datetime] = Query(None, description="Only entries at or after this time."),
+    end: Optional[datetime] = Query(None, description="Only entries before this time."),
+    current_user: Dict[str, Any] = Depends(get_current_admin_user),
+):
+    """
+    Streams every matching log entry, oldest first, as NDJSON or CSV.
+    Rows are read from a Mongo cursor and written as they arrive, so memory use
+    does not grow with the export size; the blocking cursor reads run in the
+    server's thread pool rather than on the event loop.
+    """
+    if current_user["role"] not in ["admin", "viewer"]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this resource.")
+    query = log_filter(status=status_filter, start=start, end=end)
+    logger.info(f"Admin {current_user['email']} exporting logs as {format} ({query}).")
+    filename = f"chat_logs_{datetime.utcnow():%Y%m%dT%H%M%S}.{format}"
+    return StreamingResponse(
+        export_logs(iter_logs(query, batch_size=EXPORT_BATCH_SIZE), format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.post("/add_faq")
 async def add_faq_entry(faq_data: Dict[str, Any], current_user: Dict[str, Any] = Depends(get_current_admin_user)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can add FAQs.")
     logger.info(f"Admin {current_user['email']} attempting to add FAQ: {faq_data.get('question_id')}")
-    # TODO: Add actual FAQ insertion logic here
-    return {"message": "FAQ addition endpoint (placeholder) reached."}
+
+    question_id = str(faq_data.get("question_id", "")).strip()
+    if not question_id:
+        raise HTTPException(status_code=400, detail="question_id is required")
+
+    def _keywords(value):
+        if isinstance(value, str):
+            value = value.split(',')
+        return [str(k).strip() for k in (value or []) if str(k).strip()]
+
+    faq_doc: Dict[str, Any] = {
+        "question_id": question_id,
+        "category": str(faq_data.get("category", "")).strip(),
+        "question": str(faq_data.get("question", "")).strip(),
+        "answer_en": str(faq_data.get("answer_en", "")).strip(),
+        "answer_hi": str(faq_data.get("answer_hi", "")).strip(),
+        "keywords_en": _keywords(faq_data.get("keywords_en")),
+        "keywords_hi": _keywords(faq_data.get("keywords_hi")),
+    }
+    text_for_embedding = faq_embedding_text(faq_doc)
+    if not text_for_embedding:
+        raise HTTPException(status_code=400, detail="FAQ has no text to embed")
+
+    try:
+        faq_doc.update(encode_embedding(await run_inference(get_embedding, text_for_embedding)))
+        faq_doc["updated_at"] = datetime.utcnow()
+        await run_db(upsert_faq, faq_doc)
+        # Apply locally right away; other workers pick it up through the FAQ index refresher.
+        faq_index = get_faq_index()
+        if faq_index is not None:
+            faq_index.upsert([faq_doc])
+        return {"message": "FAQ saved successfully", "question_id": question_id}
+    except Exception as e:
+        logger.error(f"Error adding FAQ {question_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to add FAQ.")
 
 
 @router.post("/answer/{query_id}")
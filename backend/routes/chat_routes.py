@@ -1,10 +1,18 @@
 from fastapi import APIRouter, HTTPException
-from backend.models.chat_model import ChatQuery, ChatResponse, LogEntry
-from backend.db.mongo_utils import get_mongo_db, insert_log_entry, get_all_faqs
-from backend.nlp.similarity import get_embedding, cosine_similarity
+from backend.models.chat_model import ChatQuery, ChatResponse, LogEntry, SearchQuery, SearchResponse, FAQMatch
+from backend.db.mongo_utils import get_mongo_db, run_db
+from backend.db.log_writer import enqueue_log_entry
+from backend.nlp.similarity import get_embedding_async
+from backend.nlp.faq_index import get_faq_index
+from backend.nlp.inference_pool import run_inference
+from backend.nlp.exact_match import FAQ_TRANSLIT_MIN_SIMILARITY
+from backend.nlp.reranker import RERANK_THRESHOLD, reranker
+from backend.services.metrics import CHAT_CACHE_LOOKUPS, CHAT_RESPONSES, CHAT_STAGE_SECONDS
+from backend.services.response_cache import response_cache
+from backend.nlp.synonyms import get_synonym_index
 import logging
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 import os
 
 logger = logging.getLogger(__name__)
@@ -18,16 +26,16 @@ KEYWORDS_COLLECTION = os.getenv("KEYWORDS_COLLECTION", "keywords")
 async def get_synonyms_from_db(query_text: str, language: str) -> List[str]:
     """
     Retrieve synonyms from MongoDB to expand user query.
+    Only used until the in-memory synonym index has been loaded.
     """
-    db = get_mongo_db()
-    synonyms_collection = db[KEYWORDS_COLLECTION]
+    synonyms_collection = get_mongo_db()[KEYWORDS_COLLECTION]
 
     query_words = [word.strip().lower() for word in query_text.split() if word.strip()]
 
     # Field depends on language
     search_field = "english_synonyms" if language == 'en' else "hindi_synonyms"
 
-    synonym_docs = list(synonyms_collection.find({search_field: {"$in": query_words}}))
+    synonym_docs = await run_db(lambda: list(synonyms_collection.find({search_field: {"$in": query_words}})))
 
     expanded_keywords = []
     for doc in synonym_docs:
@@ -42,10 +50,64 @@ async def get_synonyms_from_db(query_text: str, language: str) -> List[str]:
     return expanded_keywords
 
 
+async def expand_query(query_text: str, language: str) -> str:
+    """Appends synonyms of the query's words and phrases to the query text."""
+    synonym_index = get_synonym_index()
+    if synonym_index is not None:
+        synonym_keywords = synonym_index.expand(query_text, language)
+    else:
+        synonym_keywords = await get_synonyms_from_db(query_text, language)
+    logger.info(f"Synonyms for query '{query_text}': {synonym_keywords}")
+    expanded_query_text = query_text + " " + " ".join(synonym_keywords)
+    logger.info(f"Expanded query text for embedding: '{expanded_query_text}'")
+    return expanded_query_text
+
+
+async def retrieve(faq_index, user_embedding, query_text: str, expanded_query_text: str,
+                   top_k: int) -> Tuple[List[Tuple[Dict[str, Any], float]], float]:
+    """
+    Two-stage retrieval: the bi-encoder index returns a shortlist (top_k, or
+    RERANK_SHORTLIST when the re-ranker is enabled) which the cross-encoder
+    re-orders when its latency budget allows.
+    Returns:
+        (top_k matches, the confidence threshold that applies to their scores)
+    """
+    shortlist_size = max(top_k, reranker.shortlist) if reranker.enabled else top_k
+    matches = await run_inference(faq_index.search, user_embedding, top_k=shortlist_size,
+                                  query_text=expanded_query_text)
+    matches, reranked = await reranker.rerank(query_text, matches, top_k)
+    return matches, RERANK_THRESHOLD if reranked else CONFIDENCE_THRESHOLD
+
+
+async def record_interaction(entry: LogEntry, path: str) -> None:
+    """Queues the interaction's log entry and counts the response by status and path (cache, exact, transliteration, retrieval)."""
+    CHAT_RESPONSES.labels(status=entry.status, path=path).inc()
+    with CHAT_STAGE_SECONDS.labels(stage="log_write").time():
+        await enqueue_log_entry(entry.dict())
+
+
+def select_answer(faq: Dict[str, Any], language: str) -> Optional[str]:
+    """Returns the FAQ answer for the requested language, falling back to English."""
+    if language == 'hi' and faq.get('answer_hi'):
+        return faq['answer_hi']
+    return faq.get('answer_en') or None
+
+
+def to_faq_matches(matches: List[Tuple[Dict[str, Any], float]], language: str) -> List[FAQMatch]:
+    return [
+        FAQMatch(
+            question_id=faq.get('question_id'),
+            category=faq.get('category'),
+            question=faq.get('question'),
+            answer=select_answer(faq, language) or "",
+            similarity_score=score,
+        )
+        for faq, score in matches
+    ]
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_bot(query: ChatQuery):
-    db = get_mongo_db()
-
     user_query_text = query.query_text
     user_id = query.user_id
     language = query.language
@@ -55,76 +117,124 @@ async def chat_with_bot(query: ChatQuery):
     bot_response_text = ""
     status_text = "unanswered"
     similarity_score = None
+    ranked_matches = None
+
+    # 0. Serve exact repeats from the response cache (the interaction is still logged)
+    cache_key = response_cache.key(user_query_text, language, query.top_k) if response_cache.enabled else None
+    cached_response = response_cache.get(cache_key) if cache_key is not None else None
+    if cache_key is not None:
+        CHAT_CACHE_LOOKUPS.labels(result="hit" if cached_response is not None else "miss").inc()
+    if cached_response is not None:
+        logger.info(f"Response cache hit for query '{user_query_text}' ({language}).")
+        await record_interaction(LogEntry(
+            timestamp=datetime.now(),
+            user_id=user_id,
+            query_text=user_query_text,
+            bot_response_text=cached_response.bot_response,
+            status=cached_response.status,
+            language=language,
+            similarity_score=cached_response.similarity_score
+        ), "cache")
+        return cached_response
+
+    # 0b. Verbatim (or normalized) FAQ questions, e.g. from quick-reply buttons, are answered
+    # without synonym expansion, encoding or a similarity scan. A transliteration match is
+    # only answered once the query's own embedding confirms it.
+    faq_index = get_faq_index()
+    exact = faq_index.exact_match(user_query_text) if faq_index is not None and query.top_k == 1 else None
+    exact_faq, exact_score, exact_path = None, 1.0, "exact"
+    if exact is not None:
+        exact_faq, transliterated = exact
+        if transliterated:
+            exact_path = "transliteration"
+            try:
+                with CHAT_STAGE_SECONDS.labels(stage="embedding").time():
+                    query_embedding = await get_embedding_async(user_query_text)
+                exact_score = faq_index.similarity(exact_faq.get('question_id'), query_embedding)
+            except Exception as e:
+                logger.error(f"Could not confirm transliteration match for '{user_query_text}': {e}", exc_info=True)
+                exact_score = None
+            if exact_score is None or exact_score < FAQ_TRANSLIT_MIN_SIMILARITY:
+                logger.info(f"Transliteration match FAQ ID {exact_faq.get('question_id')} for query "
+                            f"'{user_query_text}' not confirmed (similarity {exact_score}).")
+                exact_faq = None
+    if exact_faq is not None:
+        bot_response_text = select_answer(exact_faq, language)
+        if bot_response_text:
+            logger.info(f"{exact_path.capitalize()} question match for query '{user_query_text}': "
+                        f"FAQ ID {exact_faq.get('question_id')}")
+            await record_interaction(LogEntry(
+                timestamp=datetime.now(),
+                user_id=user_id,
+                query_text=user_query_text,
+                bot_response_text=bot_response_text,
+                status="answered",
+                language=language,
+                similarity_score=exact_score
+            ), exact_path)
+            return ChatResponse(bot_response=bot_response_text, status="answered", language=language,
+                                similarity_score=exact_score)
 
     try:
         # 1. Expand query with synonyms
-        synonym_keywords = await get_synonyms_from_db(user_query_text, language)
-        logger.info(f"Synonyms for query '{user_query_text}': {synonym_keywords}")
-
-        expanded_query_text = user_query_text + " " + " ".join(synonym_keywords)
-        logger.info(f"Expanded query text for embedding: '{expanded_query_text}'")
+        with CHAT_STAGE_SECONDS.labels(stage="synonym_expansion").time():
+            expanded_query_text = await expand_query(user_query_text, language)
 
         # 2. Generate embedding for expanded query
-        user_embedding = get_embedding(expanded_query_text)
+        with CHAT_STAGE_SECONDS.labels(stage="embedding").time():
+            user_embedding = await get_embedding_async(expanded_query_text)
 
-        # 3. Retrieve all FAQs
-        all_faqs = get_all_faqs()
-        if not all_faqs:
-            logger.warning("No FAQs found in the database.")
+        # 3. Look up the in-memory FAQ index
+        faq_index = get_faq_index()
+        if faq_index is None or len(faq_index) == 0:
+            logger.warning("No FAQs found in the FAQ index.")
             bot_response_text = "I'm sorry, my knowledge base is currently empty. Please try again later."
             status_text = "unanswered"
 
-            await insert_log_entry(LogEntry(
+            await record_interaction(LogEntry(
                 timestamp=datetime.now(),
                 user_id=user_id,
                 query_text=user_query_text,
                 bot_response_text=bot_response_text,
                 status=status_text,
                 language=language
-            ).dict())
+            ), "retrieval")
             return ChatResponse(bot_response=bot_response_text, status=status_text, language=language)
 
-        # 4. Find best matching FAQ by cosine similarity
+        # 4. Rank FAQs by cosine similarity (BM25 fused into the order when enabled), one matrix-vector product,
+        #    then re-rank the shortlist with the cross-encoder if enabled
         best_match_faq = None
         highest_similarity = -1.0
 
-        for faq in all_faqs:
-            faq_embedding = faq.get('embedding')
-            if not faq_embedding:
-                logger.warning(f"FAQ with ID {faq.get('question_id', 'N/A')} missing embedding. Skipping.")
-                continue
-
-            current_similarity = cosine_similarity(user_embedding, faq_embedding)
-            logger.debug(f"FAQ ID {faq.get('question_id')} similarity: {current_similarity:.4f}")
-
-            if current_similarity > highest_similarity:
-                highest_similarity = current_similarity
-                best_match_faq = faq
-
-        similarity_score = highest_similarity
-        faq_id = best_match_faq.get('question_id', 'N/A') if best_match_faq else 'None'
-        logger.info(f"Highest similarity found: {highest_similarity:.4f} for FAQ ID: {faq_id}")
-
-        # 5. Decide on answer based on threshold
-        if best_match_faq and highest_similarity >= CONFIDENCE_THRESHOLD:
-            if language == 'hi' and best_match_faq.get('answer_hi'):
-                bot_response_text = best_match_faq.get('answer_hi', "Answer not available in Hindi.")
-            elif best_match_faq.get('answer_en'):
-                bot_response_text = best_match_faq.get('answer_en', "Answer not available in English.")
+        with CHAT_STAGE_SECONDS.labels(stage="retrieval").time():
+            matches, threshold = await retrieve(faq_index, user_embedding, user_query_text, expanded_query_text,
+                                                query.top_k)
+        with CHAT_STAGE_SECONDS.labels(stage="answer_selection").time():
+            if query.top_k > 1:
+                ranked_matches = to_faq_matches(matches, language)
+            if matches:
+                best_match_faq, highest_similarity = matches[0]
+
+            similarity_score = highest_similarity
+            faq_id = best_match_faq.get('question_id', 'N/A') if best_match_faq else 'None'
+            logger.info(f"Highest similarity found: {highest_similarity:.4f} for FAQ ID: {faq_id}")
+
+            # 5. Decide on answer based on threshold
+            if best_match_faq and highest_similarity >= threshold:
+                bot_response_text = (select_answer(best_match_faq, language)
+                                     or "I found a relevant answer, but it's not available in your selected language.")
+                status_text = "answered"
             else:
-                bot_response_text = "I found a relevant answer, but it's not available in your selected language."
-            status_text = "answered"
-        else:
-            bot_response_text = ("I'm sorry, I don't have a precise answer for that right now. "
-                                 "Your query has been noted for review by our team.")
-            status_text = "unanswered"
+                bot_response_text = ("I'm sorry, I don't have a precise answer for that right now. "
+                                     "Your query has been noted for review by our team.")
+                status_text = "unanswered"
 
     except Exception as e:
         logger.error(f"Error processing chat query '{user_query_text}': {e}", exc_info=True)
         bot_response_text = "An internal error occurred while processing your request. Please try again."
         status_text = "error"
 
-        await insert_log_entry(LogEntry(
+        await record_interaction(LogEntry(
             timestamp=datetime.now(),
             user_id=user_id,
             query_text=user_query_text,
@@ -132,12 +242,12 @@ async def chat_with_bot(query: ChatQuery):
             status=status_text,
             language=language,
             similarity_score=similarity_score
-        ).dict())
+        ), "retrieval")
         raise HTTPException(status_code=500, detail="Internal server error.")
 
     # Log interaction (except when error already logged)
     if status_text != "error":
-        await insert_log_entry(LogEntry(
+        await record_interaction(LogEntry(
             timestamp=datetime.now(),
             user_id=user_id,
             query_text=user_query_text,
@@ -145,11 +255,35 @@ async def chat_with_bot(query: ChatQuery):
             status=status_text,
             language=language,
             similarity_score=similarity_score
-        ).dict())
+        ), "retrieval")
 
-    return ChatResponse(
+    response = ChatResponse(
         bot_response=bot_response_text,
         status=status_text,
         language=language,
-        similarity_score=similarity_score
+        similarity_score=similarity_score,
+        matches=ranked_matches
     )
+    if cache_key is not None:
+        response_cache.put(cache_key, response)
+    return response
+
+
+@router.post("/search", response_model=SearchResponse)
+async def search_faqs(query: SearchQuery):
+    """
+    Returns the top_k FAQs for a query with their scores, computed in one
+    vectorized pass, so clients can offer "did you mean" alternatives.
+    """
+    try:
+        expanded_query_text = await expand_query(query.query_text, query.language)
+        user_embedding = await get_embedding_async(expanded_query_text)
+        faq_index = get_faq_index()
+        matches = []
+        if faq_index is not None:
+            matches, _ = await retrieve(faq_index, user_embedding, query.query_text, expanded_query_text,
+                                        query.top_k)
+        return SearchResponse(language=query.language, results=to_faq_matches(matches, query.language))
+    except Exception as e:
+        logger.error(f"Error searching FAQs for '{query.query_text}': {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error.")
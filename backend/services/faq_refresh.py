@@ -0,0 +1,233 @@
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from backend.db import mongo_utils
+from backend.nlp.embedding_store import FAQ_SNAPSHOT_PATH, NLP_MODEL_NAME, load_snapshot
+from backend.nlp.faq_index import FAQIndex, load_faq_index
+from backend.nlp.model_loader import get_model_name
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# auto: use a change stream when the server supports it, otherwise poll updated_at
+FAQ_REFRESH_MODE = os.getenv("FAQ_REFRESH_MODE", "auto")  # auto | change_stream | poll | off
+FAQ_REFRESH_INTERVAL = float(os.getenv("FAQ_REFRESH_INTERVAL", "5"))  # seconds between polls / retries
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class ChangeStreamUnavailable(Exception):
+    """Raised when the server (or test double) cannot open a change stream."""
+
+
+class FAQIndexRefresher:
+    """
+    Keeps the in-memory FAQ index in step with the `faqs` collection.
+    Only inserted, updated or deleted FAQs are applied to the index. Changes come
+    from a MongoDB change stream where available, or from polling the
+    `updated_at` field written by the ETL and admin API (standalone servers,
+    mongomock-style test doubles).
+    """
+
+    def __init__(self, mode: str = FAQ_REFRESH_MODE, interval: float = FAQ_REFRESH_INTERVAL):
+        self.mode = mode
+        self.interval = interval
+        self.index: Optional[FAQIndex] = None
+        self._stamps: Dict[str, Any] = {}     # question_id -> updated_at last applied
+        self._doc_ids: Dict[Any, str] = {}    # Mongo _id -> question_id, for change-stream deletes
+        self._mongo_ids: Dict[str, Any] = {}  # question_id -> Mongo _id
+        self._last_seen: Optional[datetime] = None
+        self._resume_token: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ----- Bookkeeping -----
+    def _track(self, doc: Dict[str, Any]) -> None:
+        question_id = doc.get("question_id")
+        updated_at = doc.get("updated_at")
+        self._stamps[question_id] = updated_at
+        if "_id" in doc:
+            self._doc_ids[doc["_id"]] = question_id
+            self._mongo_ids[question_id] = doc["_id"]
+        if updated_at and (self._last_seen is None or updated_at > self._last_seen):
+            self._last_seen = updated_at
+
+    def _forget(self, question_ids: Iterable[str]) -> None:
+        for question_id in question_ids:
+            self._stamps.pop(question_id, None)
+            self._doc_ids.pop(self._mongo_ids.pop(question_id, None), None)
+
+    def _apply_docs(self, docs: Iterable[Dict[str, Any]]) -> int:
+        """Upserts docs that are new or carry a newer updated_at than last applied."""
+        changed = [
+            doc for doc in docs
+            if doc.get("question_id") not in self._stamps
+            or self._stamps[doc.get("question_id")] != doc.get("updated_at")
+        ]
+        for doc in changed:
+            self._track(doc)
+        if changed:
+            self.index.upsert(changed)
+        return len(changed)
+
+    def _apply_removals(self, question_ids: Iterable[str]) -> int:
+        question_ids = list(question_ids)
+        self._forget(question_ids)
+        return self.index.remove(question_ids)
+
+    # ----- Loading -----
+    def _load_docs_with_snapshot(self):
+        """
+        FAQ documents for the startup load plus the embedding snapshot to build on.
+        With a snapshot, metadata is read without the embedding field and only FAQs
+        missing from the snapshot or updated after it was written are fetched in full.
+        """
+        snapshot = load_snapshot(FAQ_SNAPSHOT_PATH, get_model_name() or NLP_MODEL_NAME)
+        if snapshot is None:
+            return mongo_utils.get_all_faqs(with_ids=True), None
+        docs = mongo_utils.get_all_faqs(with_ids=True, with_embeddings=False)
+        built_at = snapshot.built_at
+        stale = [
+            doc.get("question_id") for doc in docs
+            if doc.get("question_id") not in snapshot
+            or (isinstance(doc.get("updated_at"), datetime) and doc["updated_at"] > built_at)
+        ]
+        if stale:
+            logger.info(f"{len(stale)} FAQs changed since the embedding snapshot; loading their embeddings.")
+            full = {doc.get("question_id"): doc for doc in mongo_utils.get_faqs_by_ids(stale)}
+            docs = [full.get(doc.get("question_id"), doc) for doc in docs]
+        return docs, snapshot
+
+    def load(self) -> FAQIndex:
+        """Performs the one full load at startup; later refreshes are incremental."""
+        docs, snapshot = self._load_docs_with_snapshot()
+        self.index = load_faq_index(docs, snapshot=snapshot)
+        self._stamps.clear()
+        self._doc_ids.clear()
+        self._mongo_ids.clear()
+        self._last_seen = None
+        for doc in docs:
+            self._track(doc)
+        return self.index
+
+    def poll_once(self) -> int:
+        """
+        Applies FAQs changed since the last poll, then reconciles deletions when the
+        collection size no longer matches what has been seen.
+        Returns:
+            Number of FAQs inserted, updated or removed
+        """
+        changed = self._apply_docs(mongo_utils.get_faqs_updated_since(self._last_seen or EPOCH))
+        if mongo_utils.count_faqs() != len(self._stamps):
+            vanished = set(self._stamps) - mongo_utils.get_faq_ids()
+            if vanished:
+                changed += self._apply_removals(vanished)
+        if changed:
+            logger.info(f"FAQ index refreshed: {changed} change(s), {len(self.index)} FAQs indexed.")
+        return changed
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        operation = change.get("operationType")
+        if operation in ("insert", "update", "replace"):
+            doc = change.get("fullDocument")
+            if doc:
+                self._apply_docs([doc])
+        elif operation == "delete":
+            question_id = self._doc_ids.get(change.get("documentKey", {}).get("_id"))
+            if question_id is not None:
+                self._apply_removals([question_id])
+        elif operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            logger.warning(f"FAQ collection {operation} event received; reloading FAQ index.")
+            self._resume_token = None
+            self.load()
+
+    def _open_stream(self):
+        try:
+            return mongo_utils.watch_faqs(self._resume_token)
+        except (OperationFailure, NotImplementedError, TypeError) as e:
+            # Standalone servers reject $changeStream; mongomock has no watch() at all.
+            raise ChangeStreamUnavailable(str(e)) from e
+
+    def _watch(self) -> None:
+        with self._open_stream() as stream:
+            # Catch up on anything written between the last load/poll and the stream opening.
+            self.poll_once()
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    self._apply_change(change)
+                    logger.info(f"FAQ index applied {change.get('operationType')} change; "
+                                f"{len(self.index)} FAQs indexed.")
+                self._resume_token = stream.resume_token
+
+    # ----- Background loop -----
+    def _run(self) -> None:
+        mode = self.mode
+        while not self._stop.is_set():
+            try:
+                if mode in ("auto", "change_stream"):
+                    self._watch()
+                    continue
+                self.poll_once()
+            except ChangeStreamUnavailable as e:
+                if mode == "auto":
+                    logger.info(f"Change streams unavailable ({e}); polling FAQs every {self.interval}s.")
+                    mode = "poll"
+                    continue
+                logger.warning(f"FAQ index refresh failed: {e}")
+            except PyMongoError as e:
+                logger.warning(f"FAQ index refresh failed: {e}")
+            except Exception as e:
+                logger.error(f"Unexpected error refreshing FAQ index: {e}", exc_info=True)
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self.mode == "off" or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="faq-index-refresh", daemon=True)
+        self._thread.start()
+        logger.info(f"FAQ index refresh started (mode={self.mode}).")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 2)
+            self._thread = None
+
+
+# Global refresher instance
+faq_refresher: Optional[FAQIndexRefresher] = None
+
+
+def preload_faq_index() -> FAQIndex:
+    """
+    Loads the FAQ index without starting the background refresh (used in a
+    pre-fork parent; see backend/services/prefork.py). start_faq_refresh()
+    in each worker then adopts it and catches up on changes since the load.
+    """
+    global faq_refresher
+    faq_refresher = FAQIndexRefresher()
+    return faq_refresher.load()
+
+
+def start_faq_refresh() -> FAQIndex:
+    """Loads the FAQ index (unless preloaded) and starts keeping it up to date in the background."""
+    global faq_refresher
+    if faq_refresher is None or faq_refresher.index is None:
+        faq_refresher = FAQIndexRefresher()
+        faq_refresher.load()
+    else:
+        logger.info(f"Using preloaded FAQ index ({len(faq_refresher.index)} FAQs).")
+    faq_refresher.start()
+    return faq_refresher.index
+
+
+def stop_faq_refresh() -> None:
+    if faq_refresher is not None:
+        faq_refresher.stop()
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator
+
+from backend.db.mongo_utils import LOG_FIELDS
+
+# --- Configuration ---
+# Documents per Mongo batch, and rows joined into one chunk of the HTTP response.
+EXPORT_BATCH_SIZE = int(os.getenv("LOG_EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_ROWS = int(os.getenv("LOG_EXPORT_CHUNK_ROWS", "500"))
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+CSV_COLUMNS = ("_id",) + LOG_FIELDS
+
+
+def _json_default(value: Any) -> Any:
+    # datetimes as ISO 8601; ObjectIds and anything else as strings
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def _ndjson_lines(logs: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for log in logs:
+        yield json.dumps(log, ensure_ascii=False, default=_json_default) + "\n"
+
+
+def _csv_lines(logs: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for log in logs:
+        writer.writerow([_csv_value(log.get(column)) for column in CSV_COLUMNS])
+        yield flush()
+
+
+def export_logs(logs: Iterable[Dict[str, Any]], fmt: str, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """
+    Serializes log entries as NDJSON or CSV, lazily.
+    Args:
+        logs: Log documents, typically the mongo_utils.iter_logs() cursor
+        fmt: 'ndjson' or 'csv'
+        chunk_rows: Rows per yielded chunk; each chunk is one write to the client
+    Returns:
+        Iterator of text chunks holding at most chunk_rows rows each
+    """
+    lines = _ndjson_lines(logs) if fmt == "ndjson" else _csv_lines(logs)
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_rows:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
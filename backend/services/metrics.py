@@ -0,0 +1,95 @@
+import os
+import time
+from typing import Optional, Sequence
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+# --- Configuration ---
+# Directory shared by the gunicorn master and its workers (see gunicorn.conf.py). When
+# set, every process writes its metrics there and /metrics aggregates all of them, so
+# a scrape answered by any worker reports the whole server. It must be set before
+# this module is imported; unset, metrics cover the serving process only.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
+# Latency buckets in seconds, from sub-millisecond cache and exact-match hits up to slow encodes.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def mark_worker_dead(pid: int) -> None:
+    """Drops the live-only samples of an exited worker; its counters and histograms keep counting toward totals."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+def render_metrics() -> bytes:
+    """All metrics in the Prometheus text exposition format, aggregated across workers in multiprocess mode."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+# --- HTTP ---
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status code.",
+                        ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route.",
+                                 ("method", "route"), buckets=DEFAULT_BUCKETS)
+
+# --- Chat pipeline ---
+CHAT_STAGE_SECONDS = Histogram("chat_stage_duration_seconds",
+                               "Time spent per chat pipeline stage (synonym_expansion, embedding, "
+                               "retrieval, answer_selection, log_write).", ("stage",), buckets=DEFAULT_BUCKETS)
+CHAT_RESPONSES = Counter("chat_responses_total", "Chat responses by status and the path that produced them.",
+                         ("status", "path"))
+CHAT_CACHE_LOOKUPS = Counter("chat_response_cache_lookups_total", "Response cache lookups by result.",
+                             ("result",))
+EMBEDDING_CACHE_LOOKUPS = Counter("embedding_cache_lookups_total", "Query embedding cache lookups by result.",
+                                  ("result",))
+
+# --- Model ---
+EMBEDDING_BATCH_SIZE = Histogram("embedding_batch_size", "Texts per batched model.encode call.",
+                                 buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+EMBEDDING_BATCH_SECONDS = Histogram("embedding_batch_duration_seconds", "Model time per embedding batch.",
+                                    buckets=DEFAULT_BUCKETS)
+EMBEDDING_QUEUE_DELAY_SECONDS = Histogram("embedding_queue_delay_seconds",
+                                          "Time a text waits in the batcher queue before its batch starts.",
+                                          buckets=DEFAULT_BUCKETS)
+
+# --- Storage ---
+LOG_FLUSH_SECONDS = Histogram("log_writer_flush_duration_seconds", "Time per batched insert of chat log entries.",
+                              buckets=DEFAULT_BUCKETS)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them until the response body is
+    sent (so streamed responses are measured in full). Requests are labelled with
+    the matched route template rather than the raw path to keep label sets small.
+    """
+
+    def __init__(self, app, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status: Optional[int] = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUESTS.labels(method=method, route=route_path, status=str(status or 500)).inc()
+            HTTP_REQUEST_SECONDS.labels(method=method, route=route_path).observe(time.perf_counter() - started)
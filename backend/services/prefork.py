@@ -0,0 +1,50 @@
+import gc
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from backend.db.mongo_utils import temporary_mongo_connection
+from backend.nlp.faq_index import get_faq_index
+from backend.nlp.model_loader import load_nlp_model
+from backend.nlp.reranker import reranker
+from backend.services.faq_refresh import preload_faq_index
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+DB_NAME = os.getenv("DB_NAME", "chatbot_db")
+ADMIN_DB_NAME = os.getenv("ADMIN_DB_NAME", "admin_db")
+NLP_MODEL_NAME = os.getenv("NLP_MODEL_NAME", "paraphrase-multilingual-MiniLM-L12-v2")
+
+
+def preload_shared_state() -> None:
+    """
+    Loads the NLP model (and re-ranker) and the FAQ index in a pre-fork parent (gunicorn with
+    preload_app, see backend/gunicorn.conf.py) so every worker forked afterwards
+    shares their memory copy-on-write.
+
+    - The FAQ index is read over a short-lived Mongo connection that is closed
+      before returning; workers open their own clients in the startup hook.
+    - No inference is run here, so no runtime thread pools exist at fork time.
+    - Everything allocated so far is moved to the GC's permanent generation
+      (gc.freeze), so collections in the workers never write to, and thereby
+      un-share, the pages holding these objects.
+    """
+    gc.disable()
+    try:
+        load_nlp_model(NLP_MODEL_NAME)
+        if reranker.enabled:
+            reranker.load()
+        with temporary_mongo_connection(MONGO_URI, DB_NAME, ADMIN_DB_NAME):
+            preload_faq_index()
+        index = get_faq_index()
+        logger.info(f"Preloaded NLP model and FAQ index ({len(index) if index is not None else 0} FAQs) "
+                    f"in pid {os.getpid()} for copy-on-write sharing.")
+    finally:
+        gc.collect()
+        gc.freeze()
+        gc.enable()
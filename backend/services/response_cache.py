@@ -0,0 +1,73 @@
+import logging
+import os
+import threading
+from typing import Any, Hashable, Optional, Tuple
+
+from backend.nlp.cache import LRUCache
+from backend.nlp.faq_index import get_faq_index
+from backend.nlp.similarity import normalize_query_text
+from backend.nlp.synonyms import get_synonym_index
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2000"))    # entries; 0 disables
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))     # seconds; 0 = no expiry
+
+
+class ResponseCache:
+    """
+    Caches complete chat responses for exact (normalized query, language, top_k)
+    repeats. The cache is tied to the current FAQ index version and synonym set;
+    when either changes, every cached response is dropped so admins never see a
+    stale answer after an update.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self._cache = LRUCache(max_entries=max_entries, ttl=ttl or None)
+        self._data_version: Optional[Tuple[Any, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._cache.enabled
+
+    def _check_version(self) -> Tuple[Any, Any]:
+        faq_index = get_faq_index()
+        synonyms = get_synonym_index()
+        version = (id(faq_index), faq_index.version if faq_index is not None else None,
+                   id(synonyms), synonyms.version if synonyms is not None else None)
+        with self._lock:
+            if version != self._data_version:
+                if self._data_version is not None:
+                    logger.info("FAQ or synonym set changed; clearing response cache.")
+                self._cache.clear()
+                self._data_version = version
+        return version
+
+    def key(self, query_text: str, language: str, top_k: int = 1) -> Hashable:
+        """
+        Builds the cache key for a query. The key embeds the data version it was
+        made under, so a response computed while the FAQs changed is never served
+        for the new version.
+        """
+        return self._check_version(), normalize_query_text(query_text), language, top_k
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        return self._cache.get(key)
+
+    def put(self, key: Hashable, response: Any) -> None:
+        if self.enabled:
+            self._cache.put(key, response)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+# Global cache instance
+response_cache = ResponseCache()
@@ -5,20 +5,25 @@ import "../styles/Admin.css";
 const AdminDashboard = () => {
   const [queries, setQueries] = useState([]);
   const [answers, setAnswers] = useState({});
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     fetchQueries();
   }, []);
 
-  const fetchQueries = async () => {
+  // Pages are newest first; the cursor for the next page comes back in X-Next-Cursor.
+  const fetchQueries = async (after = null) => {
     try {
       const token = localStorage.getItem("adminToken");
-      const res = await fetch("http://localhost:8000/admin_api/unanswered_queries", {
+      const url = new URL("http://localhost:8000/admin_api/unanswered_queries");
+      if (after) url.searchParams.set("after", after);
+      const res = await fetch(url, {
         headers: { Authorization: `Bearer ${token}` },
       });
       if (!res.ok) throw new Error("Failed to fetch queries");
       const data = await res.json();
-      setQueries(data);
+      setQueries((prev) => (after ? [...prev, ...data] : data));
+      setNextCursor(res.headers.get("X-Next-Cursor"));
     } catch (error) {
       console.error(error);
     }
@@ -87,6 +92,9 @@ const AdminDashboard = () => {
           </tbody>
         </table>
       )}
+      {nextCursor && (
+        <button onClick={() => fetchQueries(nextCursor)}>Load more</button>
+      )}
     </div>
   );
 };